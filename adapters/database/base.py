@@ -32,6 +32,22 @@ class BaseDatabaseAdapter(ABC):
         """
         pass
     
+    def get_anonymous_user(self, utln: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the anonymous user for a given UTLN without creating one.
+        
+        Adapters should override this with a real lookup; the default
+        never creates a user and reports every UTLN as unknown, so callers
+        treat the user as new.
+        
+        Args:
+            utln: Tufts University Login Name
+        
+        Returns:
+            User data dict, or None if the user has never used the system
+        """
+        return None
+    
     @abstractmethod
     def get_or_create_conversation(
         self, 
@@ -52,6 +68,31 @@ class BaseDatabaseAdapter(ABC):
         """
         pass
     
+    def get_or_create_user_conversation(
+        self,
+        utln: str,
+        conversation_id: str,
+        platform: str = 'web'
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Get or create a user and one of their conversations.
+        
+        Adapters should override this to resolve both in a single
+        transaction; the default calls get_or_create_anonymous_user() and
+        get_or_create_conversation() in turn.
+        
+        Args:
+            utln: Tufts University Login Name
+            conversation_id: Unique conversation identifier
+            platform: Platform used ('web' or 'vscode')
+        
+        Returns:
+            Tuple of (user_data dict, conversation_data dict)
+        """
+        user_data, _ = self.get_or_create_anonymous_user(utln)
+        conversation_data = self.get_or_create_conversation(conversation_id, user_data, platform)
+        return user_data, conversation_data
+    
     @abstractmethod
     def log_message(
         self,
@@ -77,6 +118,22 @@ class BaseDatabaseAdapter(ABC):
         """
         pass
     
+    def log_messages(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Log several messages at once.
+        
+        Adapters should override this to write the whole batch in a single
+        transaction; the default logs each message individually.
+        
+        Args:
+            messages: List of log_message() keyword-argument dicts, each
+                      optionally including a 'created_at' timestamp
+        """
+        for message in messages:
+            message = dict(message)
+            message.pop('created_at', None)
+            self.log_message(**message)
+    
     @abstractmethod
     def get_or_create_health_points(self, user_id: int) -> Dict[str, Any]:
         """
@@ -116,6 +173,22 @@ class BaseDatabaseAdapter(ABC):
         """
         pass
     
+    def consume_and_get_status(self, user_id: int) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Consume a health point and return the user's resulting health status.
+        
+        Adapters should override this to do both in a single transaction;
+        the default calls consume_health_point() and get_user_health_status().
+        
+        Args:
+            user_id: User ID
+        
+        Returns:
+            Tuple of (success, health status dict as from get_user_health_status)
+        """
+        can_query, _ = self.consume_health_point(user_id)
+        return can_query, self.get_user_health_status(user_id)
+    
     @abstractmethod
     def get_user_health_status(self, user_id: int) -> Dict[str, Any]:
         """
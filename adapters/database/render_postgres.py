@@ -3,17 +3,27 @@
 import os
 import hashlib
 import secrets
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Iterator, Optional, Tuple, List
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Integer, Boolean, ForeignKey, Index
+from cachetools import TTLCache
+from sqlalchemy import (
+    create_engine, insert, select, bindparam, func, text,
+    Column, String, Text, DateTime, Integer, Boolean, ForeignKey, Index
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, relationship
 
 from adapters.database.base import BaseDatabaseAdapter
 
 Base = declarative_base()
 
+# Read once at import; the test user bypasses health points in development
+DEVELOPMENT_MODE = os.getenv('DEVELOPMENT_MODE', '').lower() == 'true'
+DEV_TEST_USER_HASH = hashlib.sha256("testuser".encode()).hexdigest()
+
 
 class AnonymousUser(Base):
     """Maps Tufts UTLNs to anonymous identifiers"""
@@ -47,6 +57,10 @@ class Conversation(Base):
     user = relationship("AnonymousUser", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('idx_conversation_user_platform_created', 'user_id', 'platform', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"<Conversation(id='{self.conversation_id}', platform='{self.platform}')>"
 
@@ -131,11 +145,31 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
         if database_url is None:
             database_url = os.getenv('DATABASE_URL', 'sqlite:///cs15_tutor_logs.db')
         
-        self.engine = create_engine(database_url)
+        engine_options = {}
+        if not database_url.startswith('sqlite'):
+            # Reuse connections across requests instead of reconnecting,
+            # and drop ones the server has closed
+            engine_options.update(
+                pool_size=10,
+                max_overflow=20,
+                pool_timeout=30,
+                pool_pre_ping=True
+            )
+        
+        self.engine = create_engine(database_url, **engine_options)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
         # Create tables
         Base.metadata.create_all(bind=self.engine)
+        
+        # create_all() skips tables that already exist, so add indexes
+        # introduced after a table was first created
+        for index in Conversation.__table__.indexes:
+            index.create(bind=self.engine, checkfirst=True)
+        
+        # Recently seen user rows by UTLN; users are looked up on every request
+        self._user_cache: TTLCache = TTLCache(maxsize=10000, ttl=300)
+        self._user_cache_lock = threading.Lock()
     
     @property
     def name(self) -> str:
@@ -145,6 +179,38 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
         """Get a database session."""
         return self.SessionLocal()
     
+    @contextmanager
+    def session_scope(self) -> Iterator[Session]:
+        """
+        Provide a session for a unit of work.
+        
+        Commits when the block exits normally, rolls back if it raises,
+        and always returns the connection to the pool.
+        """
+        db = self.SessionLocal()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    @contextmanager
+    def read_scope(self) -> Iterator[Session]:
+        """
+        Provide a session for read-only work.
+        
+        Nothing is committed; closing the session ends the transaction as
+        soon as the block exits, so no snapshot is held longer than needed.
+        """
+        db = self.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
     def _generate_anonymous_id(self) -> str:
         """Generate a unique anonymous ID like 'aaaaaa00'"""
         letters = ''.join(secrets.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(6))
@@ -152,16 +218,62 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
         return letters + digits
     
     def get_or_create_anonymous_user(self, utln: str) -> Tuple[Dict[str, Any], int]:
-        """Get or create an anonymous user for a given UTLN."""
-        db = self.get_session()
-        try:
+        """
+        Get or create an anonymous user for a given UTLN.
+        
+        Only the user row is cached, since it never changes once created;
+        last_active and the conversation count are updated and read on
+        every call.
+        """
+        with self._user_cache_lock:
+            cached = self._user_cache.get(utln)
+        if cached is None:
+            user_data, conversation_count = self._load_or_create_anonymous_user(utln)
+            with self._user_cache_lock:
+                self._user_cache[utln] = user_data
+            return user_data, conversation_count
+        
+        with self.session_scope() as db:
+            last_active = datetime.utcnow()
+            db.query(AnonymousUser).filter(
+                AnonymousUser.id == cached['id']
+            ).update({
+                AnonymousUser.last_active: last_active
+            }, synchronize_session=False)
+            conversation_count = db.query(Conversation).filter(Conversation.user_id == cached['id']).count()
+        
+        return {**cached, 'last_active': last_active}, conversation_count
+    
+    def get_anonymous_user(self, utln: str) -> Optional[Dict[str, Any]]:
+        """Look up an anonymous user without creating one or touching last_active."""
+        with self._user_cache_lock:
+            cached = self._user_cache.get(utln)
+        if cached is not None:
+            return cached
+        
+        with self.read_scope() as db:
+            utln_hash = hashlib.sha256(utln.encode()).hexdigest()
+            user = db.query(AnonymousUser).filter(AnonymousUser.utln_hash == utln_hash).first()
+            if not user:
+                return None
+            
+            return {
+                'id': user.id,
+                'anonymous_id': user.anonymous_id,
+                'utln_hash': user.utln_hash,
+                'created_at': user.created_at,
+                'last_active': user.last_active
+            }
+    
+    def _load_or_create_anonymous_user(self, utln: str) -> Tuple[Dict[str, Any], int]:
+        """Get or create an anonymous user, bypassing the cache."""
+        with self.session_scope() as db:
             utln_hash = hashlib.sha256(utln.encode()).hexdigest()
             user = db.query(AnonymousUser).filter(AnonymousUser.utln_hash == utln_hash).first()
             
             if user:
                 user.last_active = datetime.utcnow()
                 conversation_count = db.query(Conversation).filter(Conversation.user_id == user.id).count()
-                db.commit()
                 
                 return {
                     'id': user.id,
@@ -179,8 +291,7 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
             
             user = AnonymousUser(utln_hash=utln_hash, anonymous_id=anonymous_id)
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            db.flush()
             
             return {
                 'id': user.id,
@@ -189,9 +300,6 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
                 'created_at': user.created_at,
                 'last_active': user.last_active
             }, 0
-            
-        finally:
-            db.close()
     
     def get_or_create_conversation(
         self, 
@@ -200,8 +308,7 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
         platform: str = 'web'
     ) -> Dict[str, Any]:
         """Get or create a conversation."""
-        db = self.get_session()
-        try:
+        with self.session_scope() as db:
             conversation = db.query(Conversation).filter(
                 Conversation.conversation_id == conversation_id
             ).first()
@@ -224,8 +331,7 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
                 platform=platform
             )
             db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            db.flush()
             
             return {
                 'id': conversation.id,
@@ -237,9 +343,63 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
                 'message_count': conversation.message_count,
                 'is_active': conversation.is_active
             }
+    
+    def get_or_create_user_conversation(
+        self,
+        utln: str,
+        conversation_id: str,
+        platform: str = 'web'
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Get or create a user and conversation in a single transaction."""
+        with self.session_scope() as db:
+            utln_hash = hashlib.sha256(utln.encode()).hexdigest()
+            user = db.query(AnonymousUser).filter(AnonymousUser.utln_hash == utln_hash).first()
             
-        finally:
-            db.close()
+            if user:
+                user.last_active = datetime.utcnow()
+            else:
+                while True:
+                    anonymous_id = self._generate_anonymous_id()
+                    if not db.query(AnonymousUser).filter(AnonymousUser.anonymous_id == anonymous_id).first():
+                        break
+                
+                user = AnonymousUser(utln_hash=utln_hash, anonymous_id=anonymous_id)
+                db.add(user)
+                db.flush()
+            
+            conversation = db.query(Conversation).filter(
+                Conversation.conversation_id == conversation_id
+            ).first()
+            
+            if not conversation:
+                conversation = Conversation(
+                    conversation_id=conversation_id,
+                    user_id=user.id,
+                    platform=platform
+                )
+                db.add(conversation)
+            
+            # Flush so ids and column defaults are populated
+            db.flush()
+            user_data = {
+                'id': user.id,
+                'anonymous_id': user.anonymous_id,
+                'utln_hash': user.utln_hash,
+                'created_at': user.created_at,
+                'last_active': user.last_active
+            }
+            conversation_data = {
+                'id': conversation.id,
+                'conversation_id': conversation.conversation_id,
+                'user_id': conversation.user_id,
+                'platform': conversation.platform,
+                'created_at': conversation.created_at,
+                'last_message_at': conversation.last_message_at,
+                'message_count': conversation.message_count,
+                'is_active': conversation.is_active
+            }
+            
+            return user_data, conversation_data
     
     def log_message(
         self,
@@ -252,8 +412,7 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
         response_time_ms: Optional[int] = None
     ) -> None:
         """Log a message (query or response)."""
-        db = self.get_session()
-        try:
+        with self.session_scope() as db:
             message = Message(
                 conversation_id=conversation_data['id'],
                 message_type=message_type,
@@ -265,36 +424,117 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
             )
             db.add(message)
             
-            conversation = db.query(Conversation).filter(
+            # Update the counters in place; the caller already has the row id
+            db.query(Conversation).filter(
                 Conversation.id == conversation_data['id']
-            ).first()
-            if conversation:
-                conversation.last_message_at = datetime.utcnow()
-                conversation.message_count += 1
-            
-            db.commit()
+            ).update({
+                Conversation.last_message_at: datetime.utcnow(),
+                Conversation.message_count: Conversation.message_count + 1
+            }, synchronize_session=False)
+    
+    def log_messages(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Log several messages in a single transaction.
+        
+        Messages are written with one multi-row INSERT and conversation
+        counters with one executemany UPDATE, bypassing the ORM unit of
+        work.
+        """
+        with self.session_scope() as db:
+            rows = []
+            # Latest timestamp and message count per conversation row
+            conversation_updates: Dict[int, Tuple[datetime, int]] = {}
+            
+            for data in messages:
+                conversation_pk = data['conversation_data']['id']
+                created_at = data.get('created_at') or datetime.utcnow()
+                temperature = data.get('temperature')
+                
+                rows.append({
+                    'conversation_id': conversation_pk,
+                    'message_type': data['message_type'],
+                    'content': data['content'],
+                    'rag_context': data.get('rag_context'),
+                    'model_used': data.get('model_used'),
+                    'temperature': str(temperature) if temperature else None,
+                    'response_time_ms': data.get('response_time_ms'),
+                    'created_at': created_at
+                })
+                
+                last_at, count = conversation_updates.get(conversation_pk, (created_at, 0))
+                conversation_updates[conversation_pk] = (max(last_at, created_at), count + 1)
+            
+            db.execute(insert(Message.__table__), rows)
+            
+            conversations = Conversation.__table__
+            db.execute(
+                conversations.update()
+                .where(conversations.c.id == bindparam('pk'))
+                .values(
+                    last_message_at=bindparam('last_at'),
+                    message_count=conversations.c.message_count + bindparam('count')
+                ),
+                [
+                    {'pk': pk, 'last_at': last_at, 'count': count}
+                    for pk, (last_at, count) in conversation_updates.items()
+                ]
+            )
             
-        finally:
-            db.close()
+            # Callers may skip the user lookup for known conversations, so
+            # record activity here
+            user_ids = {data['conversation_data']['user_id'] for data in messages}
+            db.query(AnonymousUser).filter(
+                AnonymousUser.id.in_(user_ids)
+            ).update({
+                AnonymousUser.last_active: datetime.utcnow()
+            }, synchronize_session=False)
+    
+    def _get_health_points_row(self, db: Session, user_id: int) -> UserHealthPoints:
+        """Load a user's health points row in the given session, creating it if needed."""
+        health_points = db.query(UserHealthPoints).filter(
+            UserHealthPoints.user_id == user_id
+        ).first()
+        
+        if not health_points:
+            health_points = UserHealthPoints(
+                user_id=user_id,
+                current_points=12,
+                max_points=12,
+                last_regeneration_at=datetime.utcnow()
+            )
+            db.add(health_points)
+            db.flush()
+        
+        return health_points
+    
+    @staticmethod
+    def _apply_regeneration(health_points: UserHealthPoints) -> None:
+        """Add points for the time elapsed since the last regeneration (1 point per 3 minutes)."""
+        now = datetime.utcnow()
+        time_since_last_regen = now - health_points.last_regeneration_at
+        
+        minutes_elapsed = time_since_last_regen.total_seconds() / 60
+        points_to_add = int(minutes_elapsed / 3)
+        
+        if points_to_add > 0 and health_points.current_points < health_points.max_points:
+            health_points.current_points = min(
+                health_points.current_points + points_to_add,
+                health_points.max_points
+            )
+            health_points.last_regeneration_at = now
+    
+    @staticmethod
+    def _is_dev_user(db: Session, user_id: int) -> bool:
+        """Check whether health points are bypassed for this user in development."""
+        if not DEVELOPMENT_MODE:
+            return False
+        user = db.query(AnonymousUser).filter(AnonymousUser.id == user_id).first()
+        return bool(user and user.utln_hash == DEV_TEST_USER_HASH)
     
     def get_or_create_health_points(self, user_id: int) -> Dict[str, Any]:
         """Get or create health points for a user."""
-        db = self.get_session()
-        try:
-            health_points = db.query(UserHealthPoints).filter(
-                UserHealthPoints.user_id == user_id
-            ).first()
-            
-            if not health_points:
-                health_points = UserHealthPoints(
-                    user_id=user_id,
-                    current_points=12,
-                    max_points=12,
-                    last_regeneration_at=datetime.utcnow()
-                )
-                db.add(health_points)
-                db.commit()
-                db.refresh(health_points)
+        with self.session_scope() as db:
+            health_points = self._get_health_points_row(db, user_id)
             
             return {
                 'current_points': health_points.current_points,
@@ -302,141 +542,106 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
                 'last_query_at': health_points.last_query_at,
                 'last_regeneration_at': health_points.last_regeneration_at
             }
-            
-        finally:
-            db.close()
     
     def regenerate_health_points(self, user_id: int) -> Dict[str, Any]:
         """Regenerate health points based on time elapsed (1 point per 3 minutes)."""
-        db = self.get_session()
-        try:
-            self.get_or_create_health_points(user_id)
-            
-            health_points = db.query(UserHealthPoints).filter(
-                UserHealthPoints.user_id == user_id
-            ).first()
-            
-            now = datetime.utcnow()
-            time_since_last_regen = now - health_points.last_regeneration_at
-            
-            minutes_elapsed = time_since_last_regen.total_seconds() / 60
-            points_to_add = int(minutes_elapsed / 3)
-            
-            if points_to_add > 0 and health_points.current_points < health_points.max_points:
-                health_points.current_points = min(
-                    health_points.current_points + points_to_add,
-                    health_points.max_points
-                )
-                health_points.last_regeneration_at = now
-                db.commit()
+        with self.session_scope() as db:
+            health_points = self._get_health_points_row(db, user_id)
+            self._apply_regeneration(health_points)
             
             return {
                 'current_points': health_points.current_points,
                 'max_points': health_points.max_points,
                 'can_query': health_points.current_points > 0
             }
-            
-        finally:
-            db.close()
+    
+    @staticmethod
+    def _consume(health_points: UserHealthPoints, is_dev_user: bool) -> bool:
+        """Take one point from a regenerated row; dev users are refilled instead."""
+        if is_dev_user:
+            health_points.current_points = health_points.max_points
+            health_points.last_query_at = datetime.utcnow()
+            return True
+        
+        if health_points.current_points > 0:
+            health_points.current_points -= 1
+            health_points.last_query_at = datetime.utcnow()
+            return True
+        
+        return False
+    
+    @staticmethod
+    def _health_status(health_points: UserHealthPoints, is_dev_user: bool) -> Dict[str, Any]:
+        """Build the client-facing health status for a regenerated row."""
+        if is_dev_user:
+            return {
+                'current_points': health_points.max_points,
+                'max_points': health_points.max_points,
+                'can_query': True,
+                'time_until_next_regen': 0
+            }
+        
+        now = datetime.utcnow()
+        time_since_last_regen = now - health_points.last_regeneration_at
+        seconds_elapsed = time_since_last_regen.total_seconds()
+        time_until_next_regen = max(0, 180 - (seconds_elapsed % 180))
+        
+        return {
+            'current_points': health_points.current_points,
+            'max_points': health_points.max_points,
+            'can_query': health_points.current_points > 0,
+            'time_until_next_regen': int(time_until_next_regen)
+        }
     
     def consume_health_point(self, user_id: int) -> Tuple[bool, int]:
         """Consume a health point for a query."""
-        db = self.get_session()
-        try:
-            self.regenerate_health_points(user_id)
-            
-            health_points = db.query(UserHealthPoints).filter(
-                UserHealthPoints.user_id == user_id
-            ).first()
-            
-            if not health_points:
-                health_points = UserHealthPoints(
-                    user_id=user_id,
-                    current_points=12,
-                    max_points=12,
-                    last_regeneration_at=datetime.utcnow()
-                )
-                db.add(health_points)
-            
-            # Check for development test user
-            user = db.query(AnonymousUser).filter(AnonymousUser.id == user_id).first()
-            is_dev_user = user and user.utln_hash == hashlib.sha256("testuser".encode()).hexdigest()
+        with self.session_scope() as db:
+            health_points = self._get_health_points_row(db, user_id)
+            self._apply_regeneration(health_points)
             
-            if is_dev_user and os.getenv('DEVELOPMENT_MODE', '').lower() == 'true':
-                health_points.current_points = health_points.max_points
-                health_points.last_query_at = datetime.utcnow()
-                db.commit()
+            if self._consume(health_points, self._is_dev_user(db, user_id)):
                 return True, health_points.current_points
-            
-            if health_points.current_points > 0:
-                health_points.current_points -= 1
-                health_points.last_query_at = datetime.utcnow()
-                db.commit()
-                return True, health_points.current_points
-            else:
-                return False, 0
-                
-        finally:
-            db.close()
+            return False, 0
+    
+    def consume_and_get_status(self, user_id: int) -> Tuple[bool, Dict[str, Any]]:
+        """Consume a health point and report the resulting status in one transaction."""
+        with self.session_scope() as db:
+            health_points = self._get_health_points_row(db, user_id)
+            self._apply_regeneration(health_points)
+            
+            is_dev_user = self._is_dev_user(db, user_id)
+            consumed = self._consume(health_points, is_dev_user)
+            return consumed, self._health_status(health_points, is_dev_user)
     
     def get_user_health_status(self, user_id: int) -> Dict[str, Any]:
         """Get current health status for a user."""
-        self.regenerate_health_points(user_id)
-        
-        db = self.get_session()
-        try:
-            health_points = db.query(UserHealthPoints).filter(
-                UserHealthPoints.user_id == user_id
-            ).first()
+        with self.session_scope() as db:
+            health_points = self._get_health_points_row(db, user_id)
+            self._apply_regeneration(health_points)
             
-            if not health_points:
-                return {
-                    'current_points': 12,
-                    'max_points': 12,
-                    'can_query': True,
-                    'time_until_next_regen': 180
-                }
-            
-            # Check for development test user
-            user = db.query(AnonymousUser).filter(AnonymousUser.id == user_id).first()
-            is_dev_user = user and user.utln_hash == hashlib.sha256("testuser".encode()).hexdigest()
-            
-            if is_dev_user and os.getenv('DEVELOPMENT_MODE', '').lower() == 'true':
-                return {
-                    'current_points': health_points.max_points,
-                    'max_points': health_points.max_points,
-                    'can_query': True,
-                    'time_until_next_regen': 0
-                }
-            
-            now = datetime.utcnow()
-            time_since_last_regen = now - health_points.last_regeneration_at
-            seconds_elapsed = time_since_last_regen.total_seconds()
-            time_until_next_regen = max(0, 180 - (seconds_elapsed % 180))
-            
-            return {
-                'current_points': health_points.current_points,
-                'max_points': health_points.max_points,
-                'can_query': health_points.current_points > 0,
-                'time_until_next_regen': int(time_until_next_regen)
-            }
-            
-        finally:
-            db.close()
+            return self._health_status(health_points, self._is_dev_user(db, user_id))
     
     def get_system_analytics(self) -> Dict[str, Any]:
         """Get overall system analytics."""
-        db = self.get_session()
-        try:
-            total_users = db.query(AnonymousUser).count()
-            total_conversations = db.query(Conversation).count()
-            total_messages = db.query(Message).count()
-            active_users_today = db.query(AnonymousUser).filter(
-                AnonymousUser.last_active >= datetime.utcnow().date()
-            ).count()
-            
-            web_conversations = db.query(Conversation).filter(Conversation.platform == 'web').count()
-            vscode_conversations = db.query(Conversation).filter(Conversation.platform == 'vscode').count()
+        with self.read_scope() as db:
+            # Fetch the scalar counts in a single round trip
+            total_users, active_users_today, total_messages = db.execute(select(
+                select(func.count(AnonymousUser.id)).scalar_subquery(),
+                select(func.count(AnonymousUser.id)).where(
+                    AnonymousUser.last_active >= datetime.utcnow().date()
+                ).scalar_subquery(),
+                select(func.count(Message.id)).scalar_subquery()
+            )).one()
+            
+            # One grouped scan for the total and per-platform conversation counts
+            platform_counts = dict(
+                db.query(Conversation.platform, func.count(Conversation.id))
+                .group_by(Conversation.platform)
+                .all()
+            )
+            total_conversations = sum(platform_counts.values())
+            web_conversations = platform_counts.get('web', 0)
+            vscode_conversations = platform_counts.get('vscode', 0)
             
             return {
                 'total_users': total_users,
@@ -448,16 +653,12 @@ class RenderPostgresAdapter(BaseDatabaseAdapter):
                 'average_conversations_per_user': total_conversations / total_users if total_users else 0,
                 'average_messages_per_conversation': total_messages / total_conversations if total_conversations else 0
             }
-            
-        finally:
-            db.close()
     
     def is_available(self) -> bool:
         """Check if the database is available."""
         try:
-            db = self.get_session()
-            db.execute("SELECT 1")
-            db.close()
+            with self.session_scope() as db:
+                db.execute(text("SELECT 1"))
             return True
         except Exception:
             return False
@@ -1,12 +1,18 @@
 """NatLab LLM Adapter - wrapper for the existing LLMProxy API."""
 
 import json
+import logging
 import os
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Generator, List, Dict, Any, Optional
 
 from adapters.llm.base import BaseLLMAdapter
 
+logger = logging.getLogger(__name__)
+
 
 class NatLabAdapter(BaseLLMAdapter):
     """
@@ -28,6 +34,27 @@ class NatLabAdapter(BaseLLMAdapter):
         self._api_key = None
         self._endpoint = None
         self._load_config(config_path)
+        self._session = self._create_session()
+    
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """
+        Create the HTTP session shared by all requests to the proxy.
+        
+        Pooling keeps connections to the proxy open between calls, so
+        each request skips the TCP and TLS handshake. The pool is sized
+        for one connection per worker thread. Retries only cover failed
+        connection attempts; POSTs that reached the proxy are not resent.
+        """
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
     
     def _load_config(self, config_path: Optional[str] = None):
         """Load API configuration from environment or config file."""
@@ -107,7 +134,8 @@ class NatLabAdapter(BaseLLMAdapter):
         
         headers = {
             'x-api-key': self._api_key,
-            'request_type': 'call'
+            'request_type': 'call',
+            'Content-Type': 'application/json'
         }
         
         request_data = {
@@ -123,15 +151,15 @@ class NatLabAdapter(BaseLLMAdapter):
         }
         
         try:
-            response = requests.post(self._endpoint, headers=headers, json=request_data)
+            response = self._session.post(self._endpoint, headers=headers, data=orjson.dumps(request_data))
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 return result.get('result', result.get('response', ''))
             else:
                 raise RuntimeError(f"NatLab API error: {response.status_code}")
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             raise RuntimeError(f"NatLab request failed: {e}")
     
     def generate_stream(
@@ -179,7 +207,8 @@ class NatLabAdapter(BaseLLMAdapter):
         """
         headers = {
             'x-api-key': self._api_key,
-            'request_type': 'retrieve'
+            'request_type': 'retrieve',
+            'Content-Type': 'application/json'
         }
         
         request_data = {
@@ -190,16 +219,16 @@ class NatLabAdapter(BaseLLMAdapter):
         }
         
         try:
-            response = requests.post(self._endpoint, headers=headers, json=request_data)
+            response = self._session.post(self._endpoint, headers=headers, data=orjson.dumps(request_data))
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
-                print(f"RAG retrieval error: {response.status_code}")
+                logger.warning("RAG retrieval error: %s", response.status_code)
                 return []
                 
-        except requests.exceptions.RequestException as e:
-            print(f"RAG retrieval failed: {e}")
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.warning("RAG retrieval failed: %s", e)
             return []
     
     def is_available(self) -> bool:
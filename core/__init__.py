@@ -5,6 +5,8 @@ from core.rag_service import RAGService
 from core.quality_checker import QualityChecker
 from core.health_points import HealthPointsService
 from core.auth_service import AuthService
+from core.log_writer import MessageLogWriter
+from core.conversation_store import ConversationState, get_conversation_store
 from core.config import settings
 
 __all__ = [
@@ -13,5 +15,8 @@ __all__ = [
     'QualityChecker',
     'HealthPointsService',
     'AuthService',
+    'MessageLogWriter',
+    'ConversationState',
+    'get_conversation_store',
     'settings',
 ]
@@ -3,10 +3,16 @@
 import os
 import secrets
 import logging
+import threading
+import time
 from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 
 import jwt
+from cachetools import TTLCache
+
+from core.config import settings
+from core.shared_state import get_vscode_session_store
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +45,13 @@ class AuthService:
         self.ldap_url = "ldap://ldap.eecs.tufts.edu"
         self.ldap_base_dn = "ou=people,dc=eecs,dc=tufts,dc=edu"
         
-        # In-memory store for VSCode sessions
-        self._vscode_sessions: Dict[str, Dict[str, Any]] = {}
+        # Pending VSCode logins, shared between workers when REDIS_URL is set
+        self._vscode_sessions = get_vscode_session_store()
+        
+        # Recently verified VSCode tokens: token -> (utln, expiry timestamp).
+        # The extension sends the same token on every request.
+        self._token_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+        self._token_cache_lock = threading.Lock()
         
         logger.info("Authentication service initialized")
     
@@ -65,15 +76,15 @@ class AuthService:
             conn = Connection(server, user=user_dn, password=password, authentication=SIMPLE)
             
             if conn.bind():
-                logger.info(f"LDAP authentication successful for user: {username}")
+                logger.info("LDAP authentication successful for user: %s", username)
                 conn.unbind()
                 return True
             else:
-                logger.warning(f"LDAP authentication failed for user: {username}")
+                logger.warning("LDAP authentication failed for user: %s", username)
                 return False
             
         except Exception as e:
-            logger.error(f"LDAP authentication error for user {username}: {e}")
+            logger.error("LDAP authentication error for user %s: %s", username, e)
             return False
     
     def authenticate_vscode_user(self, username: str, password: str) -> Optional[str]:
@@ -89,10 +100,8 @@ class AuthService:
         """
         try:
             username = username.lower().strip()
-            dev_mode = os.getenv('DEVELOPMENT_MODE', '').lower() == 'true'
-            
             # Skip LDAP for development users in dev mode
-            if dev_mode and username in ['dev_user', 'test_user', 'demo_user', 'testuser']:
+            if settings.development_mode and username in ['dev_user', 'test_user', 'demo_user', 'testuser']:
                 if not password or len(password.strip()) == 0:
                     return None
             else:
@@ -100,11 +109,11 @@ class AuthService:
                     return None
             
             token = self.create_vscode_auth_token(username)
-            logger.info(f"VSCode authentication successful for user: {username}")
+            logger.info("VSCode authentication successful for user: %s", username)
             return token
             
         except Exception as e:
-            logger.error(f"VSCode authentication error: {e}")
+            logger.error("VSCode authentication error: %s", e)
             return None
     
     def extract_utln_from_web_request(self, request) -> Optional[str]:
@@ -154,7 +163,7 @@ class AuthService:
             return None
             
         except Exception as e:
-            logger.error(f"Error extracting UTLN: {e}")
+            logger.error("Error extracting UTLN: %s", e)
             return None
     
     def create_vscode_auth_token(self, utln: str) -> str:
@@ -186,19 +195,27 @@ class AuthService:
         Returns:
             UTLN if token is valid, None otherwise
         """
+        with self._token_cache_lock:
+            cached = self._token_cache.get(token)
+        if cached is not None and cached[1] > time.time():
+            return cached[0]
+        
         try:
             payload = jwt.decode(token, self.jwt_secret, algorithms=['HS256'])
             utln = payload.get('utln')
             
             if utln:
-                return utln.lower().strip()
+                utln = utln.lower().strip()
+                with self._token_cache_lock:
+                    self._token_cache[token] = (utln, payload.get('exp', 0))
+                return utln
             return None
             
         except jwt.ExpiredSignatureError:
             logger.warning("VSCode auth token expired")
             return None
         except jwt.InvalidTokenError as e:
-            logger.warning(f"Invalid VSCode auth token: {e}")
+            logger.warning("Invalid VSCode auth token: %s", e)
             return None
     
     def authenticate_request(self, request) -> Tuple[Optional[str], str]:
@@ -228,7 +245,7 @@ class AuthService:
             return None, ''
             
         except Exception as e:
-            logger.error(f"Error authenticating request: {e}")
+            logger.error("Error authenticating request: %s", e)
             return None, ''
     
     def generate_vscode_login_url(self, base_url: str) -> str:
@@ -243,17 +260,7 @@ class AuthService:
         """
         session_id = secrets.token_urlsafe(32)
         
-        self._vscode_sessions[session_id] = {
-            'created_at': datetime.utcnow(),
-            'status': 'pending'
-        }
-        
-        # Clean up old sessions (older than 1 hour)
-        cutoff = datetime.utcnow() - timedelta(hours=1)
-        self._vscode_sessions = {
-            k: v for k, v in self._vscode_sessions.items() 
-            if v['created_at'] > cutoff
-        }
+        self._vscode_sessions.create(session_id)
         
         return f"{base_url}/vscode-auth?session_id={session_id}"
     
@@ -268,15 +275,10 @@ class AuthService:
         Returns:
             JWT token if successful, None otherwise
         """
-        session = self._vscode_sessions.get(session_id)
-        if not session or session['status'] != 'pending':
-            return None
-        
         token = self.create_vscode_auth_token(utln)
         
-        session['status'] = 'completed'
-        session['token'] = token
-        session['utln'] = utln
+        if not self._vscode_sessions.complete(session_id, token, utln):
+            return None
         
         return token
     
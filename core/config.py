@@ -38,6 +38,7 @@ class Settings:
     # Application settings
     development_mode: bool = field(default_factory=lambda: os.getenv('DEVELOPMENT_MODE', '').lower() == 'true')
     debug: bool = field(default_factory=lambda: os.getenv('DEBUG', '').lower() == 'true')
+    log_level: str = field(default_factory=lambda: os.getenv('LOG_LEVEL', 'INFO').upper())
     
     # Health points settings
     max_health_points: int = 12
@@ -47,6 +48,13 @@ class Settings:
     rag_threshold: float = 0.4
     rag_k: int = 5
     
+    # Conversation state settings
+    conversation_cache_size: int = 10000
+    conversation_ttl_seconds: int = 3600  # Idle conversations expire after 1 hour
+    max_conversation_turns: int = field(default_factory=lambda: int(os.getenv('MAX_CONVERSATION_TURNS', '8')))
+    max_rag_blocks: int = field(default_factory=lambda: int(os.getenv('MAX_RAG_BLOCKS', '8')))  # Most recent RAG retrievals kept per conversation
+    redis_url: Optional[str] = field(default_factory=lambda: os.getenv('REDIS_URL'))  # Shared state for multiple workers
+    
     # Quality check settings
     max_regeneration_attempts: int = 3
     quality_threshold: int = 7
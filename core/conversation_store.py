@@ -0,0 +1,222 @@
+"""Conversation state storage for the chat endpoints."""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import orjson
+from cachetools import TTLCache
+
+from core.config import settings
+
+
+@dataclass
+class ConversationState:
+    """State for a single conversation."""
+    history: List[Dict[str, str]]
+    rag_blocks: Deque[str] = field(
+        default_factory=lambda: deque(maxlen=settings.max_rag_blocks)
+    )
+    _formatted_rag: Optional[str] = field(default=None, repr=False)
+    
+    @property
+    def formatted_rag(self) -> str:
+        """Accumulated RAG context, joined lazily and cached until it changes."""
+        if self._formatted_rag is None:
+            self._formatted_rag = "\n\n".join(self.rag_blocks)
+        return self._formatted_rag
+    
+    def add_rag_context(self, rag_context: str) -> None:
+        """Append a newly retrieved RAG block, evicting the oldest beyond the limit."""
+        self.rag_blocks.append(rag_context)
+        self._formatted_rag = None
+    
+    def add_turn(self, query: str, response: str) -> None:
+        """
+        Append a user/assistant exchange to the history.
+        
+        Only the most recent turns are kept so prompts stay a constant
+        size; the system prompt at index 0 is never evicted.
+        """
+        self.history.append({"role": "user", "content": query})
+        self.history.append({"role": "assistant", "content": response})
+        
+        excess = len(self.history) - 1 - 2 * settings.max_conversation_turns
+        if excess > 0:
+            del self.history[1:1 + excess]
+
+
+class InMemoryConversationStore:
+    """
+    Process-local conversation store, bounded by size and idle time.
+    
+    State is not shared between processes, so the server must run a
+    single worker when this store is used.
+    """
+    
+    def __init__(self):
+        self._conversations: TTLCache = TTLCache(
+            maxsize=settings.conversation_cache_size,
+            ttl=settings.conversation_ttl_seconds
+        )
+        self._lock = threading.RLock()
+    
+    def get(self, conversation_id: str, base_system_prompt: str) -> ConversationState:
+        """
+        Get the state for a conversation, creating it if needed.
+        
+        Re-inserting the state on every access keeps active conversations
+        from expiring while idle ones age out of the cache.
+        """
+        with self._lock:
+            state = self._conversations.get(conversation_id)
+            if state is None:
+                state = ConversationState(
+                    history=[{"role": "system", "content": base_system_prompt}]
+                )
+            self._conversations[conversation_id] = state
+        return state
+    
+    def record_turn(
+        self,
+        conversation_id: str,
+        state: ConversationState,
+        query: str,
+        response: str,
+        rag_context: str = ""
+    ) -> None:
+        """
+        Record a completed exchange in the conversation.
+        
+        Args:
+            conversation_id: Conversation the exchange belongs to
+            state: State returned by get() for this conversation
+            query: User message
+            response: Assistant response
+            rag_context: RAG context retrieved for this turn, if any
+        """
+        if rag_context:
+            state.add_rag_context(rag_context)
+        state.add_turn(query, response)
+
+
+# Appends a turn to the message list and a RAG block to the RAG list,
+# trims both to their limits and refreshes their expiry in one step.
+#   KEYS: messages list, RAG list
+#   ARGV: ttl, max messages, max RAG blocks, user message, assistant
+#         message, RAG block ('' when nothing was retrieved)
+_RECORD_TURN_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[4], ARGV[5])
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+if ARGV[6] ~= '' then
+    redis.call('RPUSH', KEYS[2], ARGV[6])
+    redis.call('LTRIM', KEYS[2], -tonumber(ARGV[3]), -1)
+end
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+class RedisConversationStore:
+    """
+    Conversation store shared by all workers through Redis.
+    
+    Each conversation is kept as two lists, its recent messages and its
+    recent RAG blocks, which expire after the conversation has been idle
+    for the configured TTL. The system prompt is not stored; it is
+    supplied by the caller on every read.
+    """
+    
+    def __init__(self, redis_url: str):
+        """
+        Initialize the store.
+        
+        Args:
+            redis_url: Redis connection URL, e.g. redis://localhost:6379/0
+        """
+        import redis
+        
+        # The client pools connections; bound waits so a Redis stall
+        # fails the request instead of hanging a worker
+        self._client = redis.Redis.from_url(
+            redis_url,
+            socket_timeout=5,
+            socket_connect_timeout=5,
+            health_check_interval=30
+        )
+        self._record_turn = self._client.register_script(_RECORD_TURN_SCRIPT)
+    
+    @staticmethod
+    def _keys(conversation_id: str) -> List[str]:
+        return [f"convo:{conversation_id}:messages", f"convo:{conversation_id}:rag"]
+    
+    def get(self, conversation_id: str, base_system_prompt: str) -> ConversationState:
+        """Load the state for a conversation; unknown conversations start empty."""
+        messages_key, rag_key = self._keys(conversation_id)
+        
+        pipe = self._client.pipeline(transaction=False)
+        pipe.lrange(messages_key, 0, -1)
+        pipe.lrange(rag_key, 0, -1)
+        messages, rag_blocks = pipe.execute()
+        
+        state = ConversationState(
+            history=[{"role": "system", "content": base_system_prompt}]
+        )
+        state.history.extend(orjson.loads(m) for m in messages)
+        state.rag_blocks.extend(block.decode() for block in rag_blocks)
+        return state
+    
+    def record_turn(
+        self,
+        conversation_id: str,
+        state: ConversationState,
+        query: str,
+        response: str,
+        rag_context: str = ""
+    ) -> None:
+        """
+        Record a completed exchange in the conversation.
+        
+        The append and trim run as a single script so concurrent requests
+        for the same conversation cannot interleave.
+        
+        Args:
+            conversation_id: Conversation the exchange belongs to
+            state: State returned by get() for this conversation
+            query: User message
+            response: Assistant response
+            rag_context: RAG context retrieved for this turn, if any
+        """
+        user_message = {"role": "user", "content": query}
+        assistant_message = {"role": "assistant", "content": response}
+        
+        self._record_turn(
+            keys=self._keys(conversation_id),
+            args=[
+                settings.conversation_ttl_seconds,
+                2 * settings.max_conversation_turns,
+                settings.max_rag_blocks,
+                orjson.dumps(user_message),
+                orjson.dumps(assistant_message),
+                rag_context,
+            ]
+        )
+        
+        if rag_context:
+            state.add_rag_context(rag_context)
+        state.add_turn(query, response)
+
+
+def get_conversation_store():
+    """
+    Create the conversation store for this deployment.
+    
+    Returns:
+        A RedisConversationStore when REDIS_URL is set, otherwise an
+        InMemoryConversationStore
+    """
+    if settings.redis_url:
+        return RedisConversationStore(settings.redis_url)
+    return InMemoryConversationStore()
@@ -0,0 +1,121 @@
+"""Background writer for persisting chat messages off the request path."""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from adapters.database.base import BaseDatabaseAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class MessageLogWriter(threading.Thread):
+    """
+    Write-behind logger for chat messages.
+    
+    Request handlers enqueue messages and return immediately; a daemon
+    thread drains the queue and writes messages to the database in
+    batches, one transaction per batch. If the queue fills up because
+    the database can't keep up, messages are written synchronously
+    instead. At interpreter exit, queued messages are given a few seconds
+    to be written before they are dropped.
+    """
+    
+    def __init__(
+        self,
+        db_adapter: BaseDatabaseAdapter,
+        batch_size: int = 100,
+        flush_interval: float = 0.2,
+        max_queue_size: int = 10000,
+        exit_timeout: float = 5.0
+    ):
+        """
+        Initialize and start the writer thread.
+        
+        Args:
+            db_adapter: Database adapter used to persist messages
+            batch_size: Maximum number of messages written per batch
+            flush_interval: Seconds to wait for a batch to fill up
+            max_queue_size: Maximum number of messages waiting to be written
+            exit_timeout: Seconds to wait for queued messages at exit
+        """
+        super().__init__(name='message-log-writer', daemon=True)
+        self._db = db_adapter
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.start()
+        atexit.register(self.flush, exit_timeout)
+    
+    def submit(self, **message: Any) -> None:
+        """
+        Queue a message to be logged.
+        
+        Args:
+            **message: Keyword arguments for BaseDatabaseAdapter.log_message()
+        """
+        message.setdefault('created_at', datetime.utcnow())
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._write([message])
+    
+    def flush(self, timeout: float) -> bool:
+        """
+        Wait for every queued message to be written.
+        
+        Args:
+            timeout: Maximum number of seconds to wait
+        
+        Returns:
+            True if the queue drained, False if messages were left unwritten
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(
+                        "Dropping %d unwritten messages after waiting %.1fs",
+                        self._queue.unfinished_tasks, timeout
+                    )
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def run(self) -> None:
+        """Drain the queue forever, writing messages in batches."""
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Write a batch of messages, reporting rather than raising errors."""
+        try:
+            self._db.log_messages(batch)
+        except Exception as e:
+            logger.exception("Error writing %d messages: %s", len(batch), e)
+    
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block for the next message, then collect more until the batch is full or times out."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._flush_interval
+        
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
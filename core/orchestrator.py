@@ -1,14 +1,33 @@
 """Main Orchestrator for CS-15 Tutor chat handling."""
 
+import logging
 import os
 import time
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, Generator, List, Optional, Tuple
 
 from adapters.llm.base import BaseLLMAdapter
 from adapters.database.base import BaseDatabaseAdapter
+from core.log_writer import MessageLogWriter
 from core.rag_service import RAGService
 from core.quality_checker import QualityChecker
 from core.config import settings
+from core.shared_state import get_known_conversations
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=8)
+def _read_system_prompt(path: str, mtime: float) -> str:
+    """
+    Read the system prompt file.
+    
+    Cached per (path, mtime), so the file is only re-read after it changes.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        prompt = f.read().strip()
+    logger.info("Loaded system prompt from %s", path)
+    return prompt
 
 
 class Orchestrator:
@@ -27,7 +46,8 @@ class Orchestrator:
         llm_adapter: BaseLLMAdapter,
         db_adapter: BaseDatabaseAdapter,
         rag_service: Optional[RAGService] = None,
-        quality_checker: Optional[QualityChecker] = None
+        quality_checker: Optional[QualityChecker] = None,
+        log_writer: Optional[MessageLogWriter] = None
     ):
         """
         Initialize the orchestrator.
@@ -37,28 +57,39 @@ class Orchestrator:
             db_adapter: Database adapter for logging
             rag_service: RAG service (creates one if not provided)
             quality_checker: Quality checker (creates one if not provided)
+            log_writer: Background message writer (creates one if not provided)
         """
         self.llm = llm_adapter
         self.db = db_adapter
         self.rag = rag_service or RAGService()
         self.quality_checker = quality_checker or QualityChecker(llm_adapter)
+        self.log_writer = log_writer or MessageLogWriter(db_adapter)
+        
+        # Conversations already logged to, shared between workers when
+        # REDIS_URL is set
+        self._known_conversations = get_known_conversations()
         
         self._system_prompt = None
+        self._prompt_path = settings.get_system_prompt_path()
         self._load_system_prompt()
     
     def _load_system_prompt(self) -> None:
-        """Load the system prompt from file."""
-        prompt_path = settings.get_system_prompt_path()
+        """
+        Load the system prompt from file.
+        
+        In development mode the file's mtime is part of the cache key, so
+        edits are picked up on the next request at the cost of one stat().
+        """
+        prompt_path = self._prompt_path
         
         try:
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                self._system_prompt = f.read().strip()
-                print(f"[Orchestrator] Loaded system prompt from {prompt_path}")
+            mtime = os.path.getmtime(prompt_path) if settings.development_mode else 0
+            self._system_prompt = _read_system_prompt(prompt_path, mtime)
         except FileNotFoundError:
-            print(f"[Orchestrator] Warning: system_prompt.txt not found at {prompt_path}")
+            logger.warning("system_prompt.txt not found at %s", prompt_path)
             self._system_prompt = self._default_system_prompt()
         except IOError as e:
-            print(f"[Orchestrator] Warning: Error reading system_prompt.txt: {e}")
+            logger.warning("Error reading system_prompt.txt: %s", e)
             self._system_prompt = self._default_system_prompt()
     
     def _default_system_prompt(self) -> str:
@@ -100,9 +131,42 @@ class Orchestrator:
             - response_time_ms: Response time
             - metadata: Additional metadata
         """
-        request_start_time = time.time()
+        for event, payload in self.process_query_stream(
+            message=message,
+            conversation_id=conversation_id,
+            conversation_history=conversation_history,
+            utln=utln,
+            platform=platform,
+            accumulated_rag_context=accumulated_rag_context
+        ):
+            if event == 'complete':
+                return payload
+    
+    def process_query_stream(
+        self,
+        message: str,
+        conversation_id: str,
+        conversation_history: List[Dict[str, str]],
+        utln: str,
+        platform: str,
+        accumulated_rag_context: str = ""
+    ) -> Generator[Tuple[str, Any], None, None]:
+        """
+        Process a chat query, yielding an event as each stage finishes.
         
-        print(f"[Orchestrator] Processing message from {utln} ({platform}): {message[:50]}...")
+        The response is only yielded once it has passed quality checks,
+        so partially generated or rejected text never reaches the client.
+        
+        Args:
+            Same as process_query()
+        
+        Yields:
+            ('rag_complete', formatted_rag) once retrieval has finished, then
+            ('complete', response_dict) with the dict process_query() returns
+        """
+        request_start_ns = time.perf_counter_ns()
+        
+        logger.debug("Processing message from %s (%s): %.50s...", utln, platform, message)
         
         # Step 1: RAG retrieval
         raw_rag, formatted_rag = self.rag.retrieve_and_format(
@@ -110,6 +174,7 @@ class Orchestrator:
             threshold=settings.rag_threshold,
             k=settings.rag_k
         )
+        yield 'rag_complete', formatted_rag
         
         # Combine with accumulated context
         full_rag_context = accumulated_rag_context
@@ -127,12 +192,12 @@ class Orchestrator:
         )
         
         # Calculate response time
-        response_time_ms = int((time.time() - request_start_time) * 1000)
+        response_time_ms = (time.perf_counter_ns() - request_start_ns) // 1_000_000
         
-        print(f"[Orchestrator] Generated response length: {len(final_response)}")
-        print(f"[Orchestrator] Total request time: {response_time_ms}ms")
+        logger.debug("Generated response length: %d", len(final_response))
+        logger.debug("Total request time: %sms", response_time_ms)
         
-        return {
+        yield 'complete', {
             "response": final_response,
             "rag_context": formatted_rag,
             "conversation_id": conversation_id,
@@ -175,10 +240,10 @@ class Orchestrator:
             )
             
             if score >= settings.quality_threshold:
-                print(f"[Orchestrator] Quality check passed (score: {score})")
+                logger.debug("Quality check passed (score: %s)", score)
                 return response
             else:
-                print(f"[Orchestrator] Quality check failed (score: {score}): {feedback}")
+                logger.info("Quality check failed (score: %s): %s", score, feedback)
                 
                 if attempt < settings.max_regeneration_attempts - 1:
                     # Generate enhanced prompt and regenerate
@@ -189,7 +254,7 @@ class Orchestrator:
                         enhanced_message, rag_context, conversation_history
                     )
                 else:
-                    print("[Orchestrator] Max attempts reached, using last response")
+                    logger.warning("Max attempts reached, using last response")
                     return response
         
         return "I apologize, but I'm having trouble generating an appropriate response. Please try rephrasing your question."
@@ -238,7 +303,7 @@ class Orchestrator:
             return response
             
         except Exception as e:
-            print(f"[Orchestrator] Error generating response: {e}")
+            logger.exception("Error generating response: %s", e)
             return "I apologize, but I encountered an error while generating a response. Please try again."
     
     def log_interaction(
@@ -254,6 +319,12 @@ class Orchestrator:
         """
         Log a complete interaction to the database.
         
+        The user and conversation are resolved synchronously, in one
+        transaction, so the response can include their identifiers; the
+        messages themselves are handed to the background log writer.
+        After the first turn, the resolved rows are remembered, so later
+        turns of the same conversation don't touch the database here.
+        
         Args:
             utln: User's UTLN
             conversation_id: Conversation identifier
@@ -267,23 +338,28 @@ class Orchestrator:
             Logging result with anonymous_id and metadata
         """
         try:
-            # Get or create user
-            user_data, conversation_count = self.db.get_or_create_anonymous_user(utln)
+            # Get or create user and conversation
+            known = self._known_conversations.get(utln, conversation_id)
+            if known is None:
+                known = self.db.get_or_create_user_conversation(
+                    utln, conversation_id, platform
+                )
+            user_data, conversation_data = known
             
-            # Get or create conversation
-            conversation_data = self.db.get_or_create_conversation(
-                conversation_id, user_data, platform
+            # Count this turn's messages in the cache for the next lookup
+            message_count = self._known_conversations.add_turn(
+                utln, conversation_id, user_data, conversation_data
             )
             
-            # Log the query
-            self.db.log_message(
+            # Queue the query
+            self.log_writer.submit(
                 conversation_data=conversation_data,
                 message_type='query',
                 content=query
             )
             
-            # Log the response
-            self.db.log_message(
+            # Queue the response
+            self.log_writer.submit(
                 conversation_data=conversation_data,
                 message_type='response',
                 content=response,
@@ -297,10 +373,10 @@ class Orchestrator:
                 'anonymous_id': user_data['anonymous_id'],
                 'conversation_id': conversation_id,
                 'platform': platform,
-                'is_new_conversation': conversation_data['message_count'] <= 2,
-                'user_total_conversations': conversation_count
+                'is_new_conversation': message_count <= 2
             }
             
         except Exception as e:
-            print(f"[Orchestrator] Error logging interaction: {e}")
+            self._known_conversations.forget(utln, conversation_id)
+            logger.exception("Error logging interaction: %s", e)
             return {}
@@ -1,11 +1,14 @@
 """Quality Checker for response validation."""
 
 import json
+import logging
 import re
 from typing import Tuple, Optional
 
 from adapters.llm.base import BaseLLMAdapter
 
+logger = logging.getLogger(__name__)
+
 
 class QualityChecker:
     """
@@ -93,7 +96,7 @@ Return ONLY a JSON object with "score" (integer 1-10) and "feedback" (string exp
             return score, feedback
             
         except Exception as e:
-            print(f"[QualityChecker] Error: {e}")
+            logger.warning("Quality check error: %s", e)
             return 5, f"Quality check error: {str(e)}"
     
     def generate_enhancement_prompt(self, original_response: str, feedback: str) -> str:
@@ -1,8 +1,31 @@
 """RAG (Retrieval-Augmented Generation) Service."""
 
-from typing import List, Dict, Any, Optional
+import logging
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+from cachetools import TTLCache
+
 from adapters.llm.natlab import NatLabAdapter
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=512)
+def _format_collections(collections: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> str:
+    """Format (doc_summary, chunks) pairs; cached since popular queries retrieve the same documents."""
+    parts = ["The following is additional context that may be helpful in answering the user's query.\n\n"]
+    
+    for i, (doc_summary, chunks) in enumerate(collections, 1):
+        parts.append(f"#{i} {doc_summary}\n")
+        
+        for j, chunk in enumerate(chunks, 1):
+            parts.append(f"#{i}.{j} {chunk}\n")
+    
+    return "".join(parts)
+
 
 class RAGService:
     """
@@ -10,21 +33,35 @@ class RAGService:
     
     RAG retrieval is specific to the NatLab adapter which provides
     this capability. Other LLM providers don't have built-in RAG.
+    
+    Results are cached briefly, and concurrent retrievals for the same
+    query share a single request to the adapter.
     """
     
-    def __init__(self, natlab_adapter: Optional[NatLabAdapter] = None):
+    def __init__(
+        self,
+        natlab_adapter: Optional[NatLabAdapter] = None,
+        cache_size: int = 1024,
+        cache_ttl: int = 60
+    ):
         """
         Initialize the RAG service.
         
         Args:
             natlab_adapter: NatLab adapter for RAG retrieval.
                            If not provided, creates one automatically.
+            cache_size: Maximum number of cached retrievals
+            cache_ttl: Seconds a retrieval stays cached
         """
+        self._cache: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._inflight: Dict[Tuple[str, float, int], Future] = {}
+        self._lock = threading.Lock()
+        
         if natlab_adapter is None:
             try:
                 self._adapter = NatLabAdapter()
             except ValueError:
-                print("Warning: NatLab adapter not configured. RAG will be disabled.")
+                logger.warning("NatLab adapter not configured. RAG will be disabled.")
                 self._adapter = None
         else:
             self._adapter = natlab_adapter
@@ -52,8 +89,47 @@ class RAGService:
         if not self._adapter:
             return []
         
+        # session_id only tags the request, so it isn't part of the key
+        key = (query, threshold, k)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+            
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_owner:
+            try:
+                return future.result(timeout=30)
+            except Exception as e:
+                logger.error("Error waiting for in-flight retrieval: %s", e)
+                return []
+        
+        try:
+            rag_context = self._retrieve_uncached(query, threshold, k, session_id)
+            if rag_context:
+                with self._lock:
+                    self._cache[key] = rag_context
+            future.set_result(rag_context)
+            return rag_context
+        finally:
+            with self._lock:
+                del self._inflight[key]
+    
+    def _retrieve_uncached(
+        self,
+        query: str,
+        threshold: float,
+        k: int,
+        session_id: str
+    ) -> List[Dict[str, Any]]:
+        """Retrieve RAG context from the adapter, returning [] on failure."""
         try:
-            print(f"[RAG] Retrieving context for: '{query[:50]}...'")
+            logger.debug("Retrieving context for: '%.50s...'", query)
             
             rag_context = self._adapter.retrieve(
                 query=query,
@@ -63,14 +139,14 @@ class RAGService:
             )
             
             if rag_context and isinstance(rag_context, list) and len(rag_context) > 0:
-                print(f"[RAG] Retrieved {len(rag_context)} collections")
+                logger.debug("Retrieved %d collections", len(rag_context))
                 return rag_context
             else:
-                print("[RAG] No context found")
+                logger.debug("No context found")
                 return []
                 
         except Exception as e:
-            print(f"[RAG] Error retrieving context: {e}")
+            logger.error("Error retrieving context: %s", e)
             return []
     
     def format_context(self, rag_context: List[Dict[str, Any]]) -> str:
@@ -86,16 +162,10 @@ class RAGService:
         if not rag_context:
             return ""
         
-        context_string = "The following is additional context that may be helpful in answering the user's query.\n\n"
-        
-        for i, collection in enumerate(rag_context, 1):
-            doc_summary = collection.get('doc_summary', '')
-            context_string += f"#{i} {doc_summary}\n"
-            
-            for j, chunk in enumerate(collection.get('chunks', []), 1):
-                context_string += f"#{i}.{j} {chunk}\n"
-        
-        return context_string
+        return _format_collections(tuple(
+            (collection.get('doc_summary', ''), tuple(collection.get('chunks', [])))
+            for collection in rag_context
+        ))
     
     def retrieve_and_format(
         self,
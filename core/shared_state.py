@@ -0,0 +1,281 @@
+"""Request state shared between server workers.
+
+Pending VSCode logins and the per-conversation logging cache are kept in
+Redis when REDIS_URL is set, so any worker can serve any request. Without
+Redis they are held in process memory and the server must run as a single
+worker.
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+from cachetools import LRUCache, TTLCache
+
+from core.config import settings
+
+# Pending VSCode logins expire after an hour
+VSCODE_SESSION_TTL_SECONDS = 3600
+
+
+def _redis_client(redis_url: str):
+    """Create a pooled Redis client with bounded waits."""
+    import redis
+    
+    return redis.Redis.from_url(
+        redis_url,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+        health_check_interval=30
+    )
+
+
+class InMemoryVSCodeSessionStore:
+    """Process-local store for pending VSCode logins."""
+    
+    def __init__(self):
+        self._sessions: TTLCache = TTLCache(
+            maxsize=10000, ttl=VSCODE_SESSION_TTL_SECONDS
+        )
+        self._lock = threading.Lock()
+    
+    def create(self, session_id: str) -> None:
+        """Start a pending login."""
+        with self._lock:
+            self._sessions[session_id] = {'status': 'pending'}
+    
+    def complete(self, session_id: str, token: str, utln: str) -> bool:
+        """
+        Mark a pending login as completed.
+        
+        Returns:
+            False if the login is unknown, expired or already completed
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if not session or session['status'] != 'pending':
+                return False
+            session.update(status='completed', token=token, utln=utln)
+            return True
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a login's status, token and utln, or None if it is unknown."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return dict(session) if session else None
+
+
+# Completes a pending login, leaving its expiry unchanged.
+#   KEYS: session hash
+#   ARGV: token, utln
+_COMPLETE_SESSION_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'pending' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'completed', 'token', ARGV[1], 'utln', ARGV[2])
+return 1
+"""
+
+
+class RedisVSCodeSessionStore:
+    """Store for pending VSCode logins kept in Redis, shared by all workers."""
+    
+    def __init__(self, redis_url: str):
+        """
+        Initialize the store.
+        
+        Args:
+            redis_url: Redis connection URL, e.g. redis://localhost:6379/0
+        """
+        self._client = _redis_client(redis_url)
+        self._complete = self._client.register_script(_COMPLETE_SESSION_SCRIPT)
+    
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"vscode_session:{session_id}"
+    
+    def create(self, session_id: str) -> None:
+        """Start a pending login."""
+        key = self._key(session_id)
+        pipe = self._client.pipeline()
+        pipe.hset(key, 'status', 'pending')
+        pipe.expire(key, VSCODE_SESSION_TTL_SECONDS)
+        pipe.execute()
+    
+    def complete(self, session_id: str, token: str, utln: str) -> bool:
+        """
+        Mark a pending login as completed.
+        
+        The check and update run as a single script, so a login can only
+        be completed once.
+        
+        Returns:
+            False if the login is unknown, expired or already completed
+        """
+        return bool(self._complete(keys=[self._key(session_id)], args=[token, utln]))
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a login's status, token and utln, or None if it is unknown."""
+        session = self._client.hgetall(self._key(session_id))
+        if not session:
+            return None
+        return {k.decode(): v.decode() for k, v in session.items()}
+
+
+class InMemoryKnownConversations:
+    """
+    Process-local cache of conversations already resolved in the database.
+    
+    Entries are (user_data, conversation_data) pairs as returned by
+    get_or_create_user_conversation(), with the message count kept up to
+    date locally.
+    """
+    
+    def __init__(self, maxsize: int = 50000):
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+    
+    def get(self, utln: str, conversation_id: str) -> Optional[Tuple[Dict, Dict]]:
+        """Get the cached user and conversation, or None if not cached."""
+        with self._lock:
+            return self._entries.get((utln, conversation_id))
+    
+    def add_turn(
+        self,
+        utln: str,
+        conversation_id: str,
+        user_data: Dict[str, Any],
+        conversation_data: Dict[str, Any]
+    ) -> int:
+        """
+        Count a turn's two messages against a conversation.
+        
+        The conversation is cached first if it isn't already.
+        
+        Returns:
+            The conversation's message count before this turn
+        """
+        key = (utln, conversation_id)
+        with self._lock:
+            user_data, conversation_data = self._entries.get(
+                key, (user_data, conversation_data)
+            )
+            self._entries[key] = (user_data, {
+                **conversation_data,
+                'message_count': conversation_data['message_count'] + 2
+            })
+        return conversation_data['message_count']
+    
+    def forget(self, utln: str, conversation_id: str) -> None:
+        """Drop a conversation so the next turn resolves it again."""
+        with self._lock:
+            self._entries.pop((utln, conversation_id), None)
+
+
+# Caches a conversation if it isn't already, adds a turn's two messages
+# to its count and refreshes its expiry.
+#   KEYS: conversation hash
+#   ARGV: ttl, user data, conversation data, message count from the database
+#   Returns the message count before this turn
+_ADD_TURN_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'user', ARGV[2], 'conversation', ARGV[3], 'message_count', ARGV[4])
+end
+local count = redis.call('HINCRBY', KEYS[1], 'message_count', 2)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return count - 2
+"""
+
+
+class RedisKnownConversations:
+    """
+    Cache of conversations already resolved in the database, kept in Redis.
+    
+    Entries are shared by all workers, so a conversation's message count
+    stays correct whichever worker serves each turn. Keys use the UTLN's
+    hash rather than the UTLN itself, and expire with the conversation.
+    """
+    
+    def __init__(self, redis_url: str):
+        """
+        Initialize the cache.
+        
+        Args:
+            redis_url: Redis connection URL, e.g. redis://localhost:6379/0
+        """
+        self._client = _redis_client(redis_url)
+        self._add_turn = self._client.register_script(_ADD_TURN_SCRIPT)
+    
+    @staticmethod
+    def _key(utln: str, conversation_id: str) -> str:
+        utln_hash = hashlib.sha256(utln.encode()).hexdigest()
+        return f"known_convo:{utln_hash}:{conversation_id}"
+    
+    def get(self, utln: str, conversation_id: str) -> Optional[Tuple[Dict, Dict]]:
+        """Get the cached user and conversation, or None if not cached."""
+        user, conversation, message_count = self._client.hmget(
+            self._key(utln, conversation_id), 'user', 'conversation', 'message_count'
+        )
+        if user is None:
+            return None
+        return orjson.loads(user), {
+            **orjson.loads(conversation),
+            'message_count': int(message_count)
+        }
+    
+    def add_turn(
+        self,
+        utln: str,
+        conversation_id: str,
+        user_data: Dict[str, Any],
+        conversation_data: Dict[str, Any]
+    ) -> int:
+        """
+        Count a turn's two messages against a conversation.
+        
+        The conversation is cached first if it isn't already; if another
+        worker cached it in the meantime, its count wins.
+        
+        Returns:
+            The conversation's message count before this turn
+        """
+        return self._add_turn(
+            keys=[self._key(utln, conversation_id)],
+            args=[
+                settings.conversation_ttl_seconds,
+                orjson.dumps(user_data),
+                orjson.dumps(conversation_data),
+                conversation_data['message_count'],
+            ]
+        )
+    
+    def forget(self, utln: str, conversation_id: str) -> None:
+        """Drop a conversation so the next turn resolves it again."""
+        self._client.delete(self._key(utln, conversation_id))
+
+
+def get_vscode_session_store():
+    """
+    Create the pending VSCode login store for this deployment.
+    
+    Returns:
+        A RedisVSCodeSessionStore when REDIS_URL is set, otherwise an
+        InMemoryVSCodeSessionStore
+    """
+    if settings.redis_url:
+        return RedisVSCodeSessionStore(settings.redis_url)
+    return InMemoryVSCodeSessionStore()
+
+
+def get_known_conversations():
+    """
+    Create the known-conversation cache for this deployment.
+    
+    Returns:
+        A RedisKnownConversations when REDIS_URL is set, otherwise an
+        InMemoryKnownConversations
+    """
+    if settings.redis_url:
+        return RedisKnownConversations(settings.redis_url)
+    return InMemoryKnownConversations()
@@ -2,7 +2,7 @@
 
 import os
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 try:
     from google.oauth2.credentials import Credentials
@@ -26,6 +26,9 @@ class GoogleSheetsClient:
     # Google Sheets has a 50,000 character limit per cell
     MAX_CELL_LENGTH = 45000
     
+    # Retries with exponential backoff on 429 (quota) and 5xx responses
+    NUM_RETRIES = 5
+    
     def __init__(self, spreadsheet_id: Optional[str] = None):
         """
         Initialize the Google Sheets client.
@@ -127,33 +130,7 @@ class GoogleSheetsClient:
     
     def ensure_sheet_exists(self, sheet_name: str) -> None:
         """Ensure a sheet exists, create it if it doesn't."""
-        if not self.is_available():
-            return
-        
-        try:
-            spreadsheet = self.service.spreadsheets().get(
-                spreadsheetId=self.spreadsheet_id
-            ).execute()
-            existing_sheets = [
-                sheet['properties']['title'] 
-                for sheet in spreadsheet.get('sheets', [])
-            ]
-            
-            if sheet_name not in existing_sheets:
-                print(f"[Sheets] Creating sheet: {sheet_name}")
-                requests = [{
-                    "addSheet": {
-                        "properties": {"title": sheet_name}
-                    }
-                }]
-                
-                self.service.spreadsheets().batchUpdate(
-                    spreadsheetId=self.spreadsheet_id,
-                    body={"requests": requests}
-                ).execute()
-                
-        except HttpError as e:
-            print(f"[Sheets] Error ensuring sheet exists: {e}")
+        self.ensure_sheets_exist([sheet_name])
     
     def clear_sheet(self, sheet_name: str) -> None:
         """Clear all data from a sheet."""
@@ -167,7 +144,7 @@ class GoogleSheetsClient:
             self.service.spreadsheets().values().clear(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name
-            ).execute()
+            ).execute(num_retries=self.NUM_RETRIES)
         except HttpError as e:
             print(f"[Sheets] Error clearing sheet: {e}")
     
@@ -192,13 +169,96 @@ class GoogleSheetsClient:
                 range=range_name,
                 valueInputOption='RAW',
                 body=body
-            ).execute()
+            ).execute(num_retries=self.NUM_RETRIES)
             
             print(f"[Sheets] Updated {sheet_name}: {result.get('updatedCells')} cells")
             
         except HttpError as e:
             print(f"[Sheets] Error writing to sheet: {e}")
     
+    def ensure_sheets_exist(self, sheet_names: List[str]) -> None:
+        """Ensure several sheets exist, creating any missing ones in one request."""
+        if not self.is_available():
+            return
+        
+        try:
+            spreadsheet = self.service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id
+            ).execute(num_retries=self.NUM_RETRIES)
+            existing_sheets = {
+                sheet['properties']['title'] 
+                for sheet in spreadsheet.get('sheets', [])
+            }
+            
+            requests = [
+                {"addSheet": {"properties": {"title": name}}}
+                for name in sheet_names if name not in existing_sheets
+            ]
+            if requests:
+                print(f"[Sheets] Creating {len(requests)} sheet(s)")
+                self.service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={"requests": requests}
+                ).execute(num_retries=self.NUM_RETRIES)
+                
+        except HttpError as e:
+            print(f"[Sheets] Error ensuring sheets exist: {e}")
+    
+    def replace_sheets(self, sheet_data: Dict[str, List[List]]) -> bool:
+        """
+        Replace the contents of several sheets using batched requests.
+        
+        Writes every sheet in sheet_data with a single batchUpdate call,
+        then clears whatever old data lies outside the new rows with a
+        single batchClear, instead of one clear and one update per sheet,
+        to stay under the write quota. Nothing is cleared unless the
+        write succeeds, so a failed sync leaves the previous data in place.
+        
+        Args:
+            sheet_data: Mapping of sheet name to rows to write from A1
+        
+        Returns:
+            True if every sheet was fully replaced
+        """
+        if not self.is_available() or not sheet_data:
+            return False
+        
+        data = []
+        stale_ranges = []
+        for name, rows in sheet_data.items():
+            width = max((len(row) for row in rows), default=0)
+            
+            # Pad short rows so the write also blanks old cells beside them
+            if rows:
+                data.append({
+                    'range': f"{name}!A1",
+                    'values': [list(row) + [''] * (width - len(row)) for row in rows]
+                })
+            
+            stale_ranges.append(f"{name}!A{len(rows) + 1}:Z")
+            if 0 < width < 26:
+                stale_ranges.append(f"{name}!{chr(ord('A') + width)}1:Z{len(rows)}")
+        
+        try:
+            self.ensure_sheets_exist(list(sheet_data))
+            
+            result = self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': data}
+            ).execute(num_retries=self.NUM_RETRIES)
+            
+            self.service.spreadsheets().values().batchClear(
+                spreadsheetId=self.spreadsheet_id,
+                body={'ranges': stale_ranges}
+            ).execute(num_retries=self.NUM_RETRIES)
+            
+            print(f"[Sheets] Updated {len(sheet_data)} sheet(s): {result.get('totalUpdatedCells')} cells")
+            return True
+            
+        except HttpError as e:
+            print(f"[Sheets] Error replacing sheets: {e}")
+            return False
+    
     def create_spreadsheet(self, title: str = "CS 15 Tutor Analytics") -> Optional[str]:
         """Create a new spreadsheet."""
         if not GOOGLE_API_AVAILABLE or not self.service:
@@ -217,7 +277,7 @@ class GoogleSheetsClient:
                 ]
             }
             
-            result = self.service.spreadsheets().create(body=spreadsheet).execute()
+            result = self.service.spreadsheets().create(body=spreadsheet).execute(num_retries=self.NUM_RETRIES)
             spreadsheet_id = result.get('spreadsheetId')
             
             print(f"[Sheets] Created spreadsheet: {title}")
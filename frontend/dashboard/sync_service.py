@@ -1,10 +1,11 @@
 """Dashboard sync service for syncing data to Google Sheets."""
 
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import joinedload, selectinload
 
 from frontend.dashboard.sheets_client import GoogleSheetsClient
-from adapters.database.base import BaseDatabaseAdapter
 from adapters.database.render_postgres import (
     AnonymousUser, Conversation, Message, RenderPostgresAdapter
 )
@@ -16,22 +17,171 @@ class DashboardSyncService:
     def __init__(
         self, 
         sheets_client: Optional[GoogleSheetsClient] = None,
-        db_adapter: Optional[BaseDatabaseAdapter] = None
+        db_adapter: Optional[RenderPostgresAdapter] = None
     ):
         """
         Initialize the sync service.
         
         Args:
             sheets_client: Google Sheets client
-            db_adapter: Database adapter
+            db_adapter: Database adapter; the sheets are built from its ORM
+                        models, so it must be a RenderPostgresAdapter
         """
         self.sheets = sheets_client or GoogleSheetsClient()
-        self.db = db_adapter or RenderPostgresAdapter()
+        self.db: RenderPostgresAdapter = db_adapter or RenderPostgresAdapter()
     
     def is_available(self) -> bool:
         """Check if sync service is available."""
         return self.sheets.is_available()
     
+    def _overview_rows(self, session) -> List[List]:
+        """Build the rows for the Overview sheet."""
+        total_users = session.query(AnonymousUser).count()
+        total_conversations = session.query(Conversation).count()
+        total_messages = session.query(Message).count()
+        
+        web_convos = session.query(Conversation).filter(
+            Conversation.platform == 'web'
+        ).count()
+        vscode_convos = session.query(Conversation).filter(
+            Conversation.platform == 'vscode'
+        ).count()
+        
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        recent_users = session.query(AnonymousUser).filter(
+            AnonymousUser.last_active >= week_ago
+        ).count()
+        
+        return [
+            ["CS 15 Tutor System Overview", f"Updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"],
+            [""],
+            ["Metric", "Value", "Description"],
+            ["Total Users", total_users, "Anonymous users who have used the system"],
+            ["Total Conversations", total_conversations, "Individual chat sessions"],
+            ["Total Messages", total_messages, "All queries and responses"],
+            ["Web Conversations", web_convos, "Conversations via web app"],
+            ["VSCode Conversations", vscode_convos, "Conversations via VSCode extension"],
+            ["Active Users (7 days)", recent_users, "Users active in the last week"],
+        ]
+    
+    def _users_rows(self, session) -> List[List]:
+        """Build the rows for the Users sheet."""
+        users = session.query(AnonymousUser).all()
+        
+        data = [
+            ["Anonymous ID", "Created At", "Last Active", "Days Since Created"]
+        ]
+        
+        now = datetime.utcnow()
+        for user in users:
+            days_since_created = (now - user.created_at).days
+            
+            data.append([
+                user.anonymous_id,
+                user.created_at.strftime('%Y-%m-%d %H:%M'),
+                user.last_active.strftime('%Y-%m-%d %H:%M'),
+                days_since_created
+            ])
+        
+        return data
+    
+    def _conversations_rows(self, session) -> List[List]:
+        """Build the rows for the Conversations sheet."""
+        conversations = session.query(Conversation).options(
+            joinedload(Conversation.user)
+        ).all()
+        
+        data = [
+            ["User ID", "Platform", "Created At", "Last Message", "Message Count"]
+        ]
+        
+        for convo in conversations:
+            data.append([
+                convo.user.anonymous_id,
+                convo.platform,
+                convo.created_at.strftime('%Y-%m-%d %H:%M'),
+                convo.last_message_at.strftime('%Y-%m-%d %H:%M'),
+                convo.message_count
+            ])
+        
+        return data
+    
+    def _messages_rows(self, session) -> List[List]:
+        """Build the rows for the Messages sheet."""
+        messages = session.query(Message).options(
+            joinedload(Message.conversation).joinedload(Conversation.user)
+        ).all()
+        
+        data = [
+            ["Timestamp", "User ID", "Platform", "Type", "Content", "Model", "Response Time (ms)"]
+        ]
+        
+        for msg in messages:
+            convo = msg.conversation
+            
+            data.append([
+                msg.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                convo.user.anonymous_id,
+                convo.platform,
+                msg.message_type,
+                self.sheets.truncate_content(msg.content),
+                msg.model_used or 'N/A',
+                msg.response_time_ms or 0
+            ])
+        
+        return data
+    
+    def _user_interactions_rows(self, session) -> List[List]:
+        """Build the rows (query -> response pairs) for the UserInteractions sheet."""
+        # Load users and messages up front rather than one query per conversation
+        conversations = session.query(Conversation).options(
+            joinedload(Conversation.user),
+            selectinload(Conversation.messages)
+        ).order_by(
+            Conversation.created_at.desc()
+        ).all()
+        
+        data = [
+            ["User ID", "Platform", "Date", "Turn", "Query", "RAG Context", "Response", "Response Time (ms)"]
+        ]
+        
+        for convo in conversations:
+            messages = sorted(convo.messages, key=lambda m: m.created_at)
+            
+            query_msg = None
+            turn_number = 0
+            
+            for msg in messages:
+                if msg.message_type == 'query':
+                    query_msg = msg
+                    turn_number += 1
+                elif msg.message_type == 'response' and query_msg:
+                    data.append([
+                        convo.user.anonymous_id,
+                        convo.platform,
+                        convo.created_at.strftime('%Y-%m-%d %H:%M'),
+                        f"Turn {turn_number}",
+                        self.sheets.truncate_content(query_msg.content),
+                        self.sheets.truncate_content(msg.rag_context or "No RAG context"),
+                        self.sheets.truncate_content(msg.content),
+                        msg.response_time_ms or 0
+                    ])
+                    query_msg = None
+        
+        return data
+    
+    def _sync_sheets(self, builders: Dict[str, Callable]) -> bool:
+        """
+        Build rows for each sheet in one DB session and write them in one batch.
+        
+        Returns:
+            True if every sheet was written
+        """
+        with self.db.read_scope() as session:
+            sheet_data = {name: build(session) for name, build in builders.items()}
+        
+        return self.sheets.replace_sheets(sheet_data)
+    
     def sync_overview(self) -> None:
         """Sync system overview to Overview sheet."""
         if not self.is_available():
@@ -39,42 +189,7 @@ class DashboardSyncService:
             return
         
         print("[Sync] Syncing overview data...")
-        
-        session = self.db.get_session()
-        try:
-            total_users = session.query(AnonymousUser).count()
-            total_conversations = session.query(Conversation).count()
-            total_messages = session.query(Message).count()
-            
-            web_convos = session.query(Conversation).filter(
-                Conversation.platform == 'web'
-            ).count()
-            vscode_convos = session.query(Conversation).filter(
-                Conversation.platform == 'vscode'
-            ).count()
-            
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            recent_users = session.query(AnonymousUser).filter(
-                AnonymousUser.last_active >= week_ago
-            ).count()
-            
-            data = [
-                ["CS 15 Tutor System Overview", f"Updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"],
-                [""],
-                ["Metric", "Value", "Description"],
-                ["Total Users", total_users, "Anonymous users who have used the system"],
-                ["Total Conversations", total_conversations, "Individual chat sessions"],
-                ["Total Messages", total_messages, "All queries and responses"],
-                ["Web Conversations", web_convos, "Conversations via web app"],
-                ["VSCode Conversations", vscode_convos, "Conversations via VSCode extension"],
-                ["Active Users (7 days)", recent_users, "Users active in the last week"],
-            ]
-            
-            self.sheets.clear_sheet("Overview")
-            self.sheets.write_to_sheet("Overview", data)
-            
-        finally:
-            session.close()
+        self._sync_sheets({"Overview": self._overview_rows})
     
     def sync_users(self) -> None:
         """Sync user data to Users sheet."""
@@ -82,31 +197,7 @@ class DashboardSyncService:
             return
         
         print("[Sync] Syncing users data...")
-        
-        session = self.db.get_session()
-        try:
-            users = session.query(AnonymousUser).all()
-            
-            data = [
-                ["Anonymous ID", "Created At", "Last Active", "Days Since Created"]
-            ]
-            
-            now = datetime.utcnow()
-            for user in users:
-                days_since_created = (now - user.created_at).days
-                
-                data.append([
-                    user.anonymous_id,
-                    user.created_at.strftime('%Y-%m-%d %H:%M'),
-                    user.last_active.strftime('%Y-%m-%d %H:%M'),
-                    days_since_created
-                ])
-            
-            self.sheets.clear_sheet("Users")
-            self.sheets.write_to_sheet("Users", data)
-            
-        finally:
-            session.close()
+        self._sync_sheets({"Users": self._users_rows})
     
     def sync_conversations(self) -> None:
         """Sync conversation data to Conversations sheet."""
@@ -114,29 +205,7 @@ class DashboardSyncService:
             return
         
         print("[Sync] Syncing conversations data...")
-        
-        session = self.db.get_session()
-        try:
-            conversations = session.query(Conversation).all()
-            
-            data = [
-                ["User ID", "Platform", "Created At", "Last Message", "Message Count"]
-            ]
-            
-            for convo in conversations:
-                data.append([
-                    convo.user.anonymous_id,
-                    convo.platform,
-                    convo.created_at.strftime('%Y-%m-%d %H:%M'),
-                    convo.last_message_at.strftime('%Y-%m-%d %H:%M'),
-                    convo.message_count
-                ])
-            
-            self.sheets.clear_sheet("Conversations")
-            self.sheets.write_to_sheet("Conversations", data)
-            
-        finally:
-            session.close()
+        self._sync_sheets({"Conversations": self._conversations_rows})
     
     def sync_messages(self) -> None:
         """Sync message data to Messages sheet."""
@@ -144,33 +213,7 @@ class DashboardSyncService:
             return
         
         print("[Sync] Syncing messages data...")
-        
-        session = self.db.get_session()
-        try:
-            messages = session.query(Message).all()
-            
-            data = [
-                ["Timestamp", "User ID", "Platform", "Type", "Content", "Model", "Response Time (ms)"]
-            ]
-            
-            for msg in messages:
-                convo = msg.conversation
-                
-                data.append([
-                    msg.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    convo.user.anonymous_id,
-                    convo.platform,
-                    msg.message_type,
-                    self.sheets.truncate_content(msg.content),
-                    msg.model_used or 'N/A',
-                    msg.response_time_ms or 0
-                ])
-            
-            self.sheets.clear_sheet("Messages")
-            self.sheets.write_to_sheet("Messages", data)
-            
-        finally:
-            session.close()
+        self._sync_sheets({"Messages": self._messages_rows})
     
     def sync_user_interactions(self) -> None:
         """Sync user interactions (query -> response pairs) to UserInteractions sheet."""
@@ -178,50 +221,15 @@ class DashboardSyncService:
             return
         
         print("[Sync] Syncing user interactions...")
-        
-        session = self.db.get_session()
-        try:
-            conversations = session.query(Conversation).order_by(
-                Conversation.created_at.desc()
-            ).all()
-            
-            data = [
-                ["User ID", "Platform", "Date", "Turn", "Query", "RAG Context", "Response", "Response Time (ms)"]
-            ]
-            
-            for convo in conversations:
-                messages = session.query(Message).filter(
-                    Message.conversation_id == convo.id
-                ).order_by(Message.created_at.asc()).all()
-                
-                query_msg = None
-                turn_number = 0
-                
-                for msg in messages:
-                    if msg.message_type == 'query':
-                        query_msg = msg
-                        turn_number += 1
-                    elif msg.message_type == 'response' and query_msg:
-                        data.append([
-                            convo.user.anonymous_id,
-                            convo.platform,
-                            convo.created_at.strftime('%Y-%m-%d %H:%M'),
-                            f"Turn {turn_number}",
-                            self.sheets.truncate_content(query_msg.content),
-                            self.sheets.truncate_content(msg.rag_context or "No RAG context"),
-                            self.sheets.truncate_content(msg.content),
-                            msg.response_time_ms or 0
-                        ])
-                        query_msg = None
-            
-            self.sheets.clear_sheet("UserInteractions")
-            self.sheets.write_to_sheet("UserInteractions", data)
-            
-        finally:
-            session.close()
+        self._sync_sheets({"UserInteractions": self._user_interactions_rows})
     
     def full_sync(self) -> bool:
-        """Perform a complete sync of all data."""
+        """
+        Perform a complete sync of all data.
+        
+        All sheets are written and then trimmed with one batched request
+        each, rather than a clear and an update per sheet.
+        """
         if not self.is_available():
             print("[Sync] Cannot sync - sheets client not available")
             return False
@@ -229,11 +237,16 @@ class DashboardSyncService:
         print("[Sync] Starting full sync to Google Sheets...")
         
         try:
-            self.sync_overview()
-            self.sync_users()
-            self.sync_conversations()
-            self.sync_messages()
-            self.sync_user_interactions()
+            synced = self._sync_sheets({
+                "Overview": self._overview_rows,
+                "Users": self._users_rows,
+                "Conversations": self._conversations_rows,
+                "Messages": self._messages_rows,
+                "UserInteractions": self._user_interactions_rows,
+            })
+            if not synced:
+                print("[Sync] Sync failed: sheets were not fully updated")
+                return False
             
             print("[Sync] Full sync completed!")
             return True
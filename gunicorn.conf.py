@@ -0,0 +1,35 @@
+"""Gunicorn configuration for the CS-15 Tutor API server.
+
+Chat requests spend nearly all of their time waiting on the LLM provider
+and the database, so each worker serves many requests concurrently from a
+thread pool instead of blocking on one at a time.
+
+Usage:
+    gunicorn -c gunicorn.conf.py "server.app:create_app()"
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Without REDIS_URL, conversation state and pending VSCode logins are held
+# in process memory, so keep a single worker and scale concurrency with
+# threads. With REDIS_URL set, GUNICORN_WORKERS can be raised.
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+# With GUNICORN_WORKER_CLASS=gevent, each worker serves up to this many
+# requests as greenlets; gunicorn monkey-patches the standard library
+# so requests' sockets and the app's threads cooperate.
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Quality-checked generation can take several LLM round trips
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+
+def post_fork(server, worker):
+    """Make psycopg2 yield to other greenlets while waiting on Postgres."""
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
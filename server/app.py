@@ -1,13 +1,45 @@
 """Flask application factory."""
 
+import atexit
+import logging
+import logging.handlers
+import queue
+
 from flask import Flask
 from flask_cors import CORS
 
 from core.config import settings
 from core.orchestrator import Orchestrator
 from core.auth_service import AuthService
+from core.conversation_store import get_conversation_store
 from adapters.llm import get_llm_adapter
 from adapters.database import get_database_adapter
+from server.json_provider import ORJSONProvider
+
+
+def _configure_logging() -> None:
+    """
+    Route log records through a queue to a listener thread.
+    
+    Request threads only enqueue records; the listener does the actual
+    writes to stderr, so logging never blocks a request on console I/O.
+    """
+    root = logging.getLogger()
+    root.setLevel(settings.log_level)
+    
+    # Keep handlers installed by the host (e.g. gunicorn) or a previous app
+    if root.handlers:
+        return
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
 
 
 def create_app(config_override: dict = None) -> Flask:
@@ -20,7 +52,10 @@ def create_app(config_override: dict = None) -> Flask:
     Returns:
         Configured Flask application
     """
+    _configure_logging()
+    
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     
     # Apply configuration overrides
     if config_override:
@@ -33,6 +68,7 @@ def create_app(config_override: dict = None) -> Flask:
     llm_adapter = get_llm_adapter(settings.llm_provider)
     db_adapter = get_database_adapter(settings.database_provider)
     auth_service = AuthService()
+    conversation_store = get_conversation_store()
     
     # Initialize orchestrator
     orchestrator = Orchestrator(
@@ -45,6 +81,7 @@ def create_app(config_override: dict = None) -> Flask:
     app.config['db_adapter'] = db_adapter
     app.config['auth_service'] = auth_service
     app.config['orchestrator'] = orchestrator
+    app.config['conversation_store'] = conversation_store
     
     # Register blueprints
     from server.routes.chat import chat_bp
@@ -0,0 +1,29 @@
+"""orjson-backed JSON provider for Flask."""
+
+from typing import Any, Union
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson.
+    
+    Output matches Flask's default provider: dates are formatted as HTTP
+    dates by Flask's default serializer rather than as ISO 8601 by orjson,
+    non-string keys are converted to strings, and keys are sorted when
+    sort_keys is set. Other types orjson doesn't handle natively also
+    fall back to Flask's default serializer.
+    """
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize obj to a JSON string."""
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize a JSON string or bytes."""
+        return orjson.loads(s)
@@ -1,11 +1,17 @@
 """Authentication routes."""
 
+import logging
 import re
 import urllib.parse
 from flask import Blueprint, request, jsonify, current_app
 
+logger = logging.getLogger(__name__)
+
 auth_bp = Blueprint('auth', __name__)
 
+# Tufts usernames: a letter followed by 2-15 letters or digits
+USERNAME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9]{2,15}\Z')
+
 
 def get_auth():
     """Get the auth service from app context."""
@@ -61,7 +67,7 @@ def vscode_auth_endpoint():
                 return jsonify({"error": "Authentication failed"}), 401
                 
     except Exception as e:
-        print(f"[Auth] Error in VSCode auth: {e}")
+        logger.error("Error in VSCode auth: %s", e)
         return jsonify({"error": "Authentication error"}), 500
 
 
@@ -88,10 +94,10 @@ def vscode_direct_auth():
         
         if is_username_only_auth:
             # Username-only authentication for VSCode extension
-            if len(username) >= 3 and re.match(r'^[a-zA-Z][a-zA-Z0-9]{2,15}$', username):
+            if len(username) >= 3 and USERNAME_RE.match(username):
                 token = auth.create_vscode_auth_token(username.lower())
                 if token:
-                    print(f"[Auth] VSCode username-only auth successful for: {username}")
+                    logger.info("VSCode username-only auth successful for: %s", username)
                     return jsonify({
                         "success": True,
                         "token": token,
@@ -129,7 +135,7 @@ def vscode_direct_auth():
                 }), 401
             
     except Exception as e:
-        print(f"[Auth] Error in direct VSCode auth: {e}")
+        logger.error("Error in direct VSCode auth: %s", e)
         return jsonify({"error": "Authentication error"}), 500
 
 
@@ -147,5 +153,5 @@ def vscode_auth_status():
         return jsonify(status)
         
     except Exception as e:
-        print(f"[Auth] Error checking auth status: {e}")
+        logger.error("Error checking auth status: %s", e)
         return jsonify({"error": "Status check failed"}), 500
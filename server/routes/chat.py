@@ -1,15 +1,32 @@
 """Chat API routes."""
 
-import json
+import logging
 import time
-from typing import Dict, List
+from typing import Any, Dict, Generator, Tuple
+
+import orjson
 from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
 chat_bp = Blueprint('chat', __name__)
 
-# In-memory conversation storage
-conversations: Dict[str, List[Dict[str, str]]] = {}
-formatted_rag_accumulator: Dict[str, str] = {}
+
+def _sse_frame(payload: dict) -> bytes:
+    """Serialize a payload as a Server-Sent Events data frame."""
+    return b'data: ' + orjson.dumps(payload) + b'\n\n'
+
+
+# Fixed stream frames, encoded once at import
+SSE_LOADING = _sse_frame({"status": "loading", "message": "Looking at course content..."})
+SSE_THINKING = _sse_frame({"status": "thinking", "message": "Thinking..."})
+SSE_ERROR = _sse_frame({"status": "error", "error": "Sorry, an error occurred."})
+SSE_AUTH_REQUIRED = _sse_frame({
+    "status": "error",
+    "error": "Authentication required. Please log in with your Tufts credentials."
+})
 
 
 def get_orchestrator():
@@ -27,110 +44,170 @@ def get_auth():
     return current_app.config['auth_service']
 
 
+def get_conversation_store():
+    """Get the conversation store from app context."""
+    return current_app.config['conversation_store']
+
+
+def _parse_chat_request() -> Tuple[str, str]:
+    """Extract (message, conversation_id) from the JSON body of a chat request."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return '', 'default'
+    message = data.get('message')
+    if not isinstance(message, str):
+        message = ''
+    return message, data.get('conversationId', 'default')
+
+
+def _age_health_status(health_status: Dict[str, Any], elapsed_seconds: float) -> Dict[str, Any]:
+    """
+    Advance a health status by elapsed_seconds.
+    
+    The status is read when the point is consumed, before the response is
+    generated, so by the time it is returned it is stale by the generation
+    time. Points that regenerate in the meantime are added (up to the
+    maximum) and the countdown restarts from the last regeneration, as
+    the next status read would report. A countdown of 0 means none
+    applies (dev users) and the status is returned unchanged.
+    """
+    countdown = health_status.get('time_until_next_regen')
+    if not countdown:
+        return health_status
+    
+    period = settings.health_regen_minutes * 60
+    since_regen = period - countdown + elapsed_seconds
+    current_points = min(
+        health_status['current_points'] + int(since_regen // period),
+        health_status['max_points']
+    )
+    
+    return {
+        **health_status,
+        'current_points': current_points,
+        'can_query': current_points > 0,
+        'time_until_next_regen': int(period - since_regen % period)
+    }
+
+
+def _run_chat_turn(
+    utln: str,
+    platform: str,
+    message: str,
+    conversation_id: str
+) -> Generator[Tuple[str, Dict[str, Any], int], None, None]:
+    """
+    Run one chat turn; shared by the streaming and non-streaming endpoints.
+    
+    Yields (event, payload, http_status) tuples:
+    - ('loading', {}, 200) once the query has been accepted
+    - ('thinking', {}, 200) once RAG retrieval has finished
+    - ('error', payload, status) if the query is rejected; nothing follows
+    - ('complete', payload, 200) with the final response
+    """
+    orchestrator = get_orchestrator()
+    db = get_db()
+    conversation_store = get_conversation_store()
+    
+    logger.debug("Processing message from %s (%s): %.50s...", utln, platform, message)
+    
+    # isspace() checks in place instead of copying the message like strip()
+    if not message or message.isspace():
+        yield 'error', {"error": "Message is required"}, 400
+        return
+    
+    # Get user data for health points
+    user_data, _ = db.get_or_create_anonymous_user(utln)
+    
+    # Check and consume health point; the resulting status is reported
+    # with the response
+    can_query, health_status = db.consume_and_get_status(user_data['id'])
+    consumed_at = time.monotonic()
+    if not can_query:
+        yield 'error', {
+            "error": "You have run out of queries. Please wait for your health points to regenerate.",
+            "health_status": health_status
+        }, 429
+        return
+    
+    logger.debug("Health points consumed. Remaining: %s", health_status['current_points'])
+    
+    # Initialize conversation if needed
+    base_system_prompt = orchestrator.system_prompt
+    state = conversation_store.get(conversation_id, base_system_prompt)
+    
+    yield 'loading', {}, 200
+    
+    # Process the query, reporting progress as each stage finishes
+    result = {}
+    for event, payload in orchestrator.process_query_stream(
+        message=message,
+        conversation_id=conversation_id,
+        conversation_history=state.history,
+        utln=utln,
+        platform=platform,
+        accumulated_rag_context=state.formatted_rag
+    ):
+        if event == 'rag_complete':
+            yield 'thinking', {}, 200
+        elif event == 'complete':
+            result = payload
+    
+    assistant_response = result.get("response", "")
+    new_rag_context = result.get("rag_context", "")
+    response_time_ms = result.get("response_time_ms")
+    
+    # Update conversation history and accumulated RAG context. The RAG
+    # context reaches the LLM through accumulated_rag_context on the next
+    # turn; the system message in the history is skipped by
+    # format_messages(), so it is not rewritten here.
+    conversation_store.record_turn(
+        conversation_id, state, message, assistant_response, new_rag_context
+    )
+    
+    # Log interaction
+    log_result = orchestrator.log_interaction(
+        utln=utln,
+        conversation_id=conversation_id,
+        query=message,
+        response=assistant_response,
+        platform=platform,
+        rag_context=new_rag_context,
+        response_time_ms=response_time_ms
+    )
+    
+    yield 'complete', {
+        "response": assistant_response,
+        "rag_context": new_rag_context,
+        "conversation_id": conversation_id,
+        "user_info": {
+            "anonymous_id": log_result.get('anonymous_id'),
+            "platform": platform,
+            "is_new_conversation": log_result.get('is_new_conversation', False)
+        },
+        "health_status": _age_health_status(health_status, time.monotonic() - consumed_at)
+    }, 200
+
+
 @chat_bp.route('/api', methods=['POST'])
 def chat_handler():
     """Main chat endpoint (non-streaming)."""
-    request_start_time = time.time()
-    
     try:
         auth = get_auth()
-        orchestrator = get_orchestrator()
-        db = get_db()
         
         # Authenticate request
         utln, platform = auth.authenticate_request(request)
         if not utln:
             return jsonify({"error": "Authentication required. Please log in with your Tufts credentials."}), 401
         
-        data = request.get_json()
-        message = data.get('message', '')
-        conversation_id = data.get('conversationId', 'default')
-        
-        print(f"[Chat] Processing message from {utln} ({platform}): {message[:50]}...")
-        
-        if not message.strip():
-            return jsonify({"error": "Message is required"}), 400
-        
-        # Get user data for health points
-        user_data, _ = db.get_or_create_anonymous_user(utln)
-        
-        # Check and consume health point
-        can_query, remaining_points = db.consume_health_point(user_data['id'])
-        if not can_query:
-            health_status = db.get_user_health_status(user_data['id'])
-            return jsonify({
-                "error": "You have run out of queries. Please wait for your health points to regenerate.",
-                "health_status": health_status
-            }), 429
-        
-        print(f"[Chat] Health points consumed. Remaining: {remaining_points}")
+        message, conversation_id = _parse_chat_request()
         
-        # Initialize conversation if needed
-        base_system_prompt = orchestrator.system_prompt
-        if conversation_id not in conversations:
-            conversations[conversation_id] = [
-                {"role": "system", "content": base_system_prompt}
-            ]
-            formatted_rag_accumulator[conversation_id] = ""
-            print(f"[Chat] Initialized new conversation: {conversation_id}")
-        
-        # Get accumulated RAG context
-        accumulated_context = formatted_rag_accumulator.get(conversation_id, "")
-        
-        # Process the query
-        result = orchestrator.process_query(
-            message=message,
-            conversation_id=conversation_id,
-            conversation_history=conversations[conversation_id],
-            utln=utln,
-            platform=platform,
-            accumulated_rag_context=accumulated_context
-        )
-        
-        assistant_response = result.get("response", "")
-        new_rag_context = result.get("rag_context", "")
-        response_time_ms = result.get("response_time_ms")
-        
-        # Accumulate RAG context
-        if new_rag_context:
-            previous = formatted_rag_accumulator.get(conversation_id, "")
-            combined = previous + ("\n\n" if previous else "") + new_rag_context
-            formatted_rag_accumulator[conversation_id] = combined
-            enhanced_system_prompt = f"{base_system_prompt}\n\n{combined}"
-            conversations[conversation_id][0]["content"] = enhanced_system_prompt
-        
-        # Update conversation history
-        conversations[conversation_id].append({"role": "user", "content": message})
-        conversations[conversation_id].append({"role": "assistant", "content": assistant_response})
-        
-        # Log interaction
-        log_result = orchestrator.log_interaction(
-            utln=utln,
-            conversation_id=conversation_id,
-            query=message,
-            response=assistant_response,
-            platform=platform,
-            rag_context=new_rag_context,
-            response_time_ms=response_time_ms
-        )
-        
-        # Get updated health status
-        health_status = db.get_user_health_status(user_data['id'])
-        
-        return jsonify({
-            "response": assistant_response,
-            "rag_context": new_rag_context,
-            "conversation_id": conversation_id,
-            "user_info": {
-                "anonymous_id": log_result.get('anonymous_id'),
-                "platform": platform,
-                "is_new_conversation": log_result.get('is_new_conversation', False)
-            },
-            "health_status": health_status
-        })
+        for event, payload, status in _run_chat_turn(utln, platform, message, conversation_id):
+            if event in ('error', 'complete'):
+                return jsonify(payload), status
         
     except Exception as error:
-        print(f"[Chat] Error: {error}")
+        logger.exception("Error processing chat request: %s", error)
         return jsonify({"error": "Sorry, an error occurred while processing your request."}), 500
 
 
@@ -142,108 +219,25 @@ def chat_handler_stream():
     # Authenticate request
     utln, platform = auth.authenticate_request(request)
     if not utln:
-        def error_stream():
-            yield f'data: {json.dumps({"status": "error", "error": "Authentication required. Please log in with your Tufts credentials."})}\n\n'
-        return Response(stream_with_context(error_stream()), mimetype='text/event-stream')
+        return Response(SSE_AUTH_REQUIRED, mimetype='text/event-stream')
     
-    data = request.get_json()
-    message = data.get('message', '')
-    conversation_id = data.get('conversationId', 'default')
+    message, conversation_id = _parse_chat_request()
     
     def generate_events():
         try:
-            orchestrator = get_orchestrator()
-            db = get_db()
-            
-            print(f"[Chat] Streaming message from {utln} ({platform}): {message[:50]}...")
-            
-            if not message.strip():
-                yield f'data: {json.dumps({"error": "Message is required"})}\n\n'
-                return
-            
-            # Get user data for health points
-            user_data, _ = db.get_or_create_anonymous_user(utln)
-            
-            # Check and consume health point
-            can_query, remaining_points = db.consume_health_point(user_data['id'])
-            if not can_query:
-                health_status = db.get_user_health_status(user_data['id'])
-                yield f'data: {json.dumps({"error": "You have run out of queries.", "health_status": health_status})}\n\n'
-                return
-            
-            # Initialize conversation if needed
-            base_system_prompt = orchestrator.system_prompt
-            if conversation_id not in conversations:
-                conversations[conversation_id] = [
-                    {"role": "system", "content": base_system_prompt}
-                ]
-                formatted_rag_accumulator[conversation_id] = ""
-            
-            # Send status updates
-            yield f'data: {json.dumps({"status": "loading", "message": "Looking at course content..."})}\n\n'
-            yield f'data: {json.dumps({"status": "thinking", "message": "Thinking..."})}\n\n'
-            
-            # Get accumulated RAG context
-            accumulated_context = formatted_rag_accumulator.get(conversation_id, "")
-            
-            # Process the query
-            result = orchestrator.process_query(
-                message=message,
-                conversation_id=conversation_id,
-                conversation_history=conversations[conversation_id],
-                utln=utln,
-                platform=platform,
-                accumulated_rag_context=accumulated_context
-            )
-            
-            assistant_response = result.get("response", "")
-            new_rag_context = result.get("rag_context", "")
-            response_time_ms = result.get("response_time_ms")
-            
-            # Accumulate RAG context
-            if new_rag_context:
-                previous = formatted_rag_accumulator.get(conversation_id, "")
-                combined = previous + ("\n\n" if previous else "") + new_rag_context
-                formatted_rag_accumulator[conversation_id] = combined
-                enhanced_system_prompt = f"{base_system_prompt}\n\n{combined}"
-                conversations[conversation_id][0]["content"] = enhanced_system_prompt
-            
-            # Update conversation history
-            conversations[conversation_id].append({"role": "user", "content": message})
-            conversations[conversation_id].append({"role": "assistant", "content": assistant_response})
-            
-            # Log interaction
-            log_result = orchestrator.log_interaction(
-                utln=utln,
-                conversation_id=conversation_id,
-                query=message,
-                response=assistant_response,
-                platform=platform,
-                rag_context=new_rag_context,
-                response_time_ms=response_time_ms
-            )
-            
-            # Get updated health status
-            health_status = db.get_user_health_status(user_data['id'])
-            
-            # Send final response
-            response_data = {
-                "status": "complete",
-                "response": assistant_response,
-                "rag_context": new_rag_context,
-                "conversation_id": conversation_id,
-                "user_info": {
-                    "anonymous_id": log_result.get('anonymous_id'),
-                    "platform": platform,
-                    "is_new_conversation": log_result.get('is_new_conversation', False)
-                },
-                "health_status": health_status
-            }
-            yield f'data: {json.dumps(response_data)}\n\n'
+            for event, payload, _ in _run_chat_turn(utln, platform, message, conversation_id):
+                if event == 'loading':
+                    yield SSE_LOADING
+                elif event == 'thinking':
+                    yield SSE_THINKING
+                elif event == 'error':
+                    yield _sse_frame(payload)
+                else:
+                    yield _sse_frame({"status": "complete", **payload})
             
         except Exception as error:
-            print(f"[Chat] Stream error: {error}")
-            yield f'data: {json.dumps({"status": "error", "error": "Sorry, an error occurred."})}\n\n'
+            logger.exception("Stream error: %s", error)
+            yield SSE_ERROR
     
     return Response(
         stream_with_context(generate_events()),
@@ -1,6 +1,13 @@
 """Health check and analytics routes."""
 
-from flask import Blueprint, request, jsonify, current_app
+import logging
+
+import orjson
+from flask import Blueprint, Response, request, jsonify, current_app
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
 
 health_bp = Blueprint('health', __name__)
 
@@ -15,30 +22,35 @@ def get_db():
     return current_app.config['db_adapter']
 
 
+# Static response bodies, encoded once at import
+ROOT_BODY = orjson.dumps({
+    "name": "CS-15 Tutor API",
+    "version": "2.0.0",
+    "status": "running",
+    "endpoints": {
+        "chat": "POST /api",
+        "chat_stream": "POST /api/stream",
+        "health": "GET /health",
+        "health_status": "GET /health-status",
+        "analytics": "GET /analytics",
+        "vscode_auth": "GET/POST /vscode-auth",
+        "vscode_direct_auth": "POST /vscode-direct-auth"
+    },
+    "documentation": "See README.md for full API documentation"
+})
+HEALTH_BODY = orjson.dumps({"status": "healthy"})
+
+
 @health_bp.route('/', methods=['GET'])
 def root():
     """Root endpoint - API information."""
-    return jsonify({
-        "name": "CS-15 Tutor API",
-        "version": "2.0.0",
-        "status": "running",
-        "endpoints": {
-            "chat": "POST /api",
-            "chat_stream": "POST /api/stream",
-            "health": "GET /health",
-            "health_status": "GET /health-status",
-            "analytics": "GET /analytics",
-            "vscode_auth": "GET/POST /vscode-auth",
-            "vscode_direct_auth": "POST /vscode-direct-auth"
-        },
-        "documentation": "See README.md for full API documentation"
-    }), 200
+    return Response(ROOT_BODY, mimetype='application/json')
 
 
 @health_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({"status": "healthy"}), 200
+    return Response(HEALTH_BODY, mimetype='application/json')
 
 
 @health_bp.route('/health-status', methods=['GET'])
@@ -53,8 +65,15 @@ def health_status_endpoint():
         if not utln:
             return jsonify({"error": "Authentication required"}), 401
         
-        # Get user data
-        user_data, _ = db.get_or_create_anonymous_user(utln)
+        # Look up the user; don't create one just to report status
+        user_data = db.get_anonymous_user(utln)
+        if user_data is None:
+            return jsonify({
+                'current_points': settings.max_health_points,
+                'max_points': settings.max_health_points,
+                'can_query': True,
+                'time_until_next_regen': settings.health_regen_minutes * 60
+            })
         
         # Get health status
         health_status = db.get_user_health_status(user_data['id'])
@@ -62,7 +81,7 @@ def health_status_endpoint():
         return jsonify(health_status)
         
     except Exception as e:
-        print(f"[Health] Error getting health status: {e}")
+        logger.error("Error getting health status: %s", e)
         return jsonify({"error": "Health status error"}), 500
 
 
@@ -86,5 +105,5 @@ def analytics_endpoint():
         })
         
     except Exception as e:
-        print(f"[Health] Error getting analytics: {e}")
+        logger.error("Error getting analytics: %s", e)
         return jsonify({"error": "Analytics error"}), 500
@@ -3,7 +3,7 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 import csv
 from dotenv import load_dotenv
 import os
@@ -13,8 +13,6 @@ load_dotenv()
 email = os.getenv("PIAZZA_EMAIL")
 password = os.getenv("PIAZZA_PASSWORD")
 
-all_posts = {}
-
 def get_i_answer():
     try:
         answer_box = driver.find_element(By.CSS_SELECTOR, '[data-id="i_answer"]')
@@ -24,31 +22,41 @@ def get_i_answer():
     except NoSuchElementException:
         return None
 
-def search_folder(folder_button):
+def search_folder(folder_name, writer, file):
     post_links = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "feed-item-wrapper")))
     print(f"✅ Found {len(post_links)} posts.")
-    data = []
+    previous_content = None
     for i in range(len(post_links)):
         post = post_links[i]
 
         try:
             driver.execute_script("arguments[0].click();", post)
             
-            # Wait for content to load
+            # Wait for the previous post's content to be replaced, then for
+            # the new one. Piazza may update the content element in place,
+            # so give up after 2s and read whatever is shown.
+            if previous_content is not None:
+                try:
+                    WebDriverWait(driver, timeout=2).until(EC.staleness_of(previous_content))
+                except TimeoutException:
+                    pass
             content = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-id='renderHtmlId']")))
+            previous_content = content
 
             text = content.text
 
             full_post = "Question: " + text
-            full_post += "\nAnswer: " + get_i_answer() if get_i_answer() else ""
-
-            data.append(full_post)
+            answer = get_i_answer()
+            full_post += "\nAnswer: " + answer if answer else ""
 
-            time.sleep(1)
+            # Write each post as it's scraped so a crash doesn't lose the run
+            writer.writerow([folder_name, full_post])
+            file.flush()
 
         except Exception as e:
             print(f"❌ Error on post {i}: {e}")
-    all_posts[folder_button.text] = data
+            # Don't wait on this post's content going stale for the next one
+            previous_content = None
 
 driver = webdriver.Chrome()
 driver.get("https://piazza.com/")
@@ -81,21 +89,26 @@ folder_buttons = wait.until(
 
 print(f"✅ Found {len(folder_buttons)} folders.")
 
-for folder_button in folder_buttons:
-    try:
-        folder_name = folder_button.text
-        folder_button.click()
-        time.sleep(2)
-        print(f"Searching in {folder_name}...")
-        search_folder(folder_button)
-    except Exception as e:
-        print(f"❌ Error searching in {folder_name}: {e}")
-
 with open("piazza_posts.csv", "a", newline='', encoding="utf-8") as file:
     writer = csv.writer(file)
-    for folder, posts in all_posts.items():
-        for post in posts:
-            writer.writerow([folder, post])
+    for folder_button in folder_buttons:
+        try:
+            folder_name = folder_button.text
+            # Wait for the previous folder's feed to be replaced instead of
+            # sleeping. Piazza may re-render the feed in place and keep the
+            # first post, so give up after the old 2s and let search_folder
+            # wait for the posts that are present.
+            previous_feed = driver.find_elements(By.CLASS_NAME, "feed-item-wrapper")
+            folder_button.click()
+            if previous_feed:
+                try:
+                    WebDriverWait(driver, timeout=2).until(EC.staleness_of(previous_feed[0]))
+                except TimeoutException:
+                    pass
+            print(f"Searching in {folder_name}...")
+            search_folder(folder_name, writer, file)
+        except Exception as e:
+            print(f"❌ Error searching in {folder_name}: {e}")
 
 # for folder_button in folder_buttons:
 #     try:
@@ -3,12 +3,20 @@
 
 import sys
 import os
+import re
+import json
+import time
+import random
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Add the responses-api-server directory to Python path
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'responses-api-server'))
+import requests
+from urllib3.exceptions import NewConnectionError
 
-from llmproxy import pdf_upload, text_upload
+# Relative paths given on the command line resolve against this directory
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(BASE_PATH))
 
 
 CONTENT_DIRECTORIES = {
@@ -18,6 +26,69 @@ CONTENT_DIRECTORIES = {
     'labs': 'lab_specs',
 }
 
+CONTENT_PATHS = {
+    category: os.path.join(BASE_PATH, dirname)
+    for category, dirname in CONTENT_DIRECTORIES.items()
+}
+
+DEFAULT_WORKERS = 8
+
+# Extensions of the files that can be uploaded
+UPLOADABLE_RE = re.compile(r'\.(pdf|txt)\Z', re.IGNORECASE)
+
+# Attempts per upload when the connection to the proxy cannot be opened
+UPLOAD_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+
+# Records which files each session has already received, so directory
+# uploads can skip files that haven't changed since
+MANIFEST_PATH = os.path.join(BASE_PATH, '.upload_manifest.json')
+
+
+@functools.lru_cache(maxsize=None)
+def _llmproxy():
+    """
+    Import the LLM proxy client on first use.
+    
+    It lives in responses-api-server, which is only added to the path
+    here, so --help and argument errors don't pay for the import.
+    """
+    proxy_path = os.path.join(REPO_ROOT, 'responses-api-server')
+    if proxy_path not in sys.path:
+        sys.path.append(proxy_path)
+    
+    import llmproxy
+    return llmproxy
+
+
+def _is_connect_failure(error: Exception):
+    """
+    Whether an upload failed before anything was sent to the proxy.
+    
+    Uploads are not idempotent: a timeout or 5xx after the request went
+    out may mean the proxy already ingested the document, so only
+    failures to open the connection are safe to retry. Errors that
+    aren't from requests (llmproxy is outside this tree) are never
+    retried.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or error.response is not None:
+        return False
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _with_retry(upload):
+    """Call upload(), retrying failed connection attempts with jittered exponential backoff"""
+    for attempt in range(UPLOAD_ATTEMPTS):
+        try:
+            return upload()
+        except Exception as e:
+            if attempt == UPLOAD_ATTEMPTS - 1 or not _is_connect_failure(e):
+                raise
+            time.sleep(RETRY_BASE_DELAY * 2 ** attempt + random.random() * 0.1)
+
 
 def upload_pdf(pdf_path: str, session_id: str = 'GenericSession', strategy: str = 'smart'):
     """Upload a single PDF file"""
@@ -26,17 +97,22 @@ def upload_pdf(pdf_path: str, session_id: str = 'GenericSession', strategy: str
         return False
     
     print(f" Uploading {os.path.basename(pdf_path)}...")
+    ok, message = _upload_pdf(pdf_path, session_id, strategy)
+    print(f" {message}")
+    return ok
+
+
+def _upload_pdf(pdf_path: str, session_id: str, strategy: str):
+    """Upload a PDF already known to exist, returning (ok, status message)"""
     try:
-        response = pdf_upload(
+        response = _with_retry(lambda: _llmproxy().pdf_upload(
             path=pdf_path,
             session_id=session_id,
             strategy=strategy
-        )
-        print(f" Upload successful: {response}")
-        return True
+        ))
+        return True, f"Upload successful: {response}"
     except Exception as e:
-        print(f" Upload failed: {e}")
-        return False
+        return False, f"Upload failed: {e}"
 
 
 def upload_text(text_path: str, description: str = None, session_id: str = 'GenericSession', strategy: str = 'smart'):
@@ -45,122 +121,239 @@ def upload_text(text_path: str, description: str = None, session_id: str = 'Gene
         print(f" File not found: {text_path}")
         return False
     
+    print(f" Uploading {os.path.basename(text_path)}...")
+    ok, message = _upload_text(text_path, description, session_id, strategy)
+    print(f" {message}")
+    return ok
+
+
+def _upload_text(text_path: str, description: str, session_id: str, strategy: str):
+    """Upload a text file already known to exist, returning (ok, status message)"""
     try:
         with open(text_path, 'r', encoding='utf-8') as f:
             text_content = f.read()
     except Exception as e:
-        print(f" Error reading file: {e}")
-        return False
+        return False, f"Error reading file: {e}"
     
     if not description:
         description = f"CS 15 course content from {os.path.basename(text_path)}"
     
-    print(f" Uploading {os.path.basename(text_path)}...")
     try:
-        response = text_upload(
+        response = _with_retry(lambda: _llmproxy().text_upload(
             text=text_content,
             strategy=strategy,
             description=description,
             session_id=session_id
-        )
-        print(f" Upload successful: {response}")
-        return True
+        ))
+        return True, f"Upload successful: {response}"
     except Exception as e:
-        print(f" Upload failed: {e}")
-        return False
+        return False, f"Upload failed: {e}"
+
+
+def _iter_uploadable(directory: str, file_pattern: str = None):
+    """Yield (path, kind) for each PDF and text file in a directory"""
+    matches_pattern = re.compile(re.escape(file_pattern), re.IGNORECASE).search if file_pattern else None
+    
+    # scandir reports file types from the directory listing itself, so
+    # no file needs a separate stat
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            match = UPLOADABLE_RE.search(entry.name)
+            if not match:
+                continue
+            if matches_pattern and not matches_pattern(entry.name):
+                continue
+            yield entry.path, match.group(1).lower()
+
+
+def _prefetch(path: str):
+    """Ask the kernel to start reading a file into the page cache ahead of its upload"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _upload_file(path: str, kind: str, session_id: str, strategy: str):
+    """Upload an existing file of the given kind ('pdf' or 'txt')"""
+    if kind == 'pdf':
+        return _upload_pdf(path, session_id, strategy)
+    return _upload_text(path, None, session_id, strategy)
+
+
+def _count_pdfs(files):
+    """Number of PDFs in a list of (path, kind) pairs"""
+    return sum(1 for _, kind in files if kind == 'pdf')
+
+
+def _load_manifest():
+    """Load the upload manifest, starting a new one if it is missing or unreadable"""
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest):
+    """Write the upload manifest atomically"""
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
 
 
-def upload_directory(directory: str, file_pattern: str = None, session_id: str = 'GenericSession', strategy: str = 'smart'):
+def _manifest_key(path: str):
+    """Identify a file version by path, modification time and size"""
+    st = os.stat(path)
+    return f"{path}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def upload_files(files, session_id: str = 'GenericSession', strategy: str = 'smart', workers: int = DEFAULT_WORKERS, force: bool = False):
+    """
+    Upload existing (path, kind) files concurrently, returning how many succeeded.
+    
+    Files already uploaded to this session with the same strategy, and
+    unchanged since, are skipped and counted as successful unless force
+    is set.
+    """
+    # Fail the whole batch up front if the proxy client can't be imported
+    _llmproxy()
+    
+    manifest = _load_manifest()
+    uploaded = manifest.setdefault(session_id, {})
+    
+    keys = {path: _manifest_key(path) for path, _ in files}
+    if not force:
+        unchanged = [path for path, _ in files if uploaded.get(keys[path]) == strategy]
+        if unchanged:
+            print(f" Skipping {len(unchanged)} unchanged files already uploaded")
+        files = [(path, kind) for path, kind in files if uploaded.get(keys[path]) != strategy]
+    success_count = len(keys) - len(files)
+    
+    # Each upload is an independent request to the proxy, so overlap them.
+    # Workers only return their status; progress is printed here, one
+    # line per finished file, so output from different files can't mix.
+    # The manifest is saved even if the run is interrupted, so finished
+    # uploads aren't repeated next time.
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for path, kind in files:
+                # Files waiting for a worker are read from disk meanwhile
+                _prefetch(path)
+                futures[executor.submit(_upload_file, path, kind, session_id, strategy)] = path
+            for done, future in enumerate(as_completed(futures), 1):
+                ok, message = future.result()
+                if ok:
+                    success_count += 1
+                    uploaded[keys[futures[future]]] = strategy
+                print(f" [{done}/{len(futures)}] {os.path.basename(futures[future])}: {message}")
+    finally:
+        _save_manifest(manifest)
+    
+    return success_count
+
+
+def upload_directory(directory: str, file_pattern: str = None, session_id: str = 'GenericSession', strategy: str = 'smart', workers: int = DEFAULT_WORKERS, force: bool = False):
     """Upload all files from a directory"""
     if not os.path.exists(directory):
         print(f" Directory not found: {directory}")
         return
     
-    files = os.listdir(directory)
-    
-    # Filter by pattern if provided
-    if file_pattern:
-        files = [f for f in files if file_pattern.lower() in f.lower()]
+    files = list(_iter_uploadable(directory, file_pattern))
     
-    # Separate PDFs and text files
-    pdf_files = [f for f in files if f.lower().endswith('.pdf')]
-    txt_files = [f for f in files if f.lower().endswith('.txt')]
-    
-    total = len(pdf_files) + len(txt_files)
+    total = len(files)
     if total == 0:
         print(f"  No files found in {directory}")
         return
     
-    print(f" Found {len(pdf_files)} PDFs and {len(txt_files)} text files in {directory}")
-    
-    success_count = 0
-    
-    # Upload PDFs
-    for filename in pdf_files:
-        pdf_path = os.path.join(directory, filename)
-        if upload_pdf(pdf_path, session_id, strategy):
-            success_count += 1
+    pdf_count = _count_pdfs(files)
+    print(f" Found {pdf_count} PDFs and {total - pdf_count} text files in {directory}")
     
-    # Upload text files
-    for filename in txt_files:
-        text_path = os.path.join(directory, filename)
-        if upload_text(text_path, session_id=session_id, strategy=strategy):
-            success_count += 1
+    success_count = upload_files(files, session_id, strategy, workers, force)
     
     print(f"\n Uploaded {success_count}/{total} files successfully")
 
 
-def upload_all_content(session_id: str = 'GenericSession', strategy: str = 'smart'):
+def upload_all_content(session_id: str = 'GenericSession', strategy: str = 'smart', workers: int = DEFAULT_WORKERS, force: bool = False):
     """Upload all course content from all directories"""
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    
     print(" Uploading all CS 15 course content...")
     print("=" * 60)
     
-    total_success = 0
-    total_files = 0
+    files = []
     
-    for content_type, dirname in CONTENT_DIRECTORIES.items():
-        dir_path = os.path.join(base_path, dirname)
-        
+    # Several categories share a directory; collect each directory once
+    for dir_path in dict.fromkeys(CONTENT_PATHS.values()):
         if not os.path.exists(dir_path):
-            print(f"  Skipping {dirname} (not found)")
+            print(f"  Skipping {os.path.basename(dir_path)} (not found)")
             continue
         
-        print(f"\n Processing {content_type} ({dirname})...")
-        print("-" * 60)
-        
-        files = [f for f in os.listdir(dir_path) if f.lower().endswith(('.pdf', '.txt'))]
-        total_files += len(files)
-        
-        for filename in files:
-            file_path = os.path.join(dir_path, filename)
-            
-            if filename.lower().endswith('.pdf'):
-                if upload_pdf(file_path, session_id, strategy):
-                    total_success += 1
-            elif filename.lower().endswith('.txt'):
-                if upload_text(file_path, session_id=session_id, strategy=strategy):
-                    total_success += 1
+        files.extend(_iter_uploadable(dir_path))
+    
+    total_files = len(files)
+    pdf_count = _count_pdfs(files)
+    print(f" Found {pdf_count} PDFs and {total_files - pdf_count} text files")
+    print("-" * 60)
+    
+    # Upload everything through one pool so directories overlap too
+    total_success = upload_files(files, session_id, strategy, workers, force)
     
     print("\n" + "=" * 60)
     print(f" Upload complete: {total_success}/{total_files} files uploaded successfully")
 
 
-def upload_specific_category(category: str, session_id: str = 'GenericSession', strategy: str = 'smart'):
+def upload_specific_category(category: str, session_id: str = 'GenericSession', strategy: str = 'smart', workers: int = DEFAULT_WORKERS, force: bool = False):
     """Upload all files from a specific category"""
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    
     if category not in CONTENT_DIRECTORIES:
         print(f" Unknown category: {category}")
         print(f"Available categories: {', '.join(CONTENT_DIRECTORIES.keys())}")
         return
     
-    dirname = CONTENT_DIRECTORIES[category]
-    dir_path = os.path.join(base_path, dirname)
+    print(f" Uploading {category} content from {CONTENT_DIRECTORIES[category]}...")
+    upload_directory(CONTENT_PATHS[category], session_id=session_id, strategy=strategy, workers=workers, force=force)
+
+
+def _resolve_path(path: str):
+    """Resolve a command-line path relative to the course content directory"""
+    return path if os.path.isabs(path) else os.path.join(BASE_PATH, path)
+
+
+def _cmd_file(args):
+    """Handle the file command"""
+    file_path = _resolve_path(args.path)
     
-    print(f" Uploading {category} content from {dirname}...")
-    upload_directory(dir_path, session_id=session_id, strategy=strategy)
+    # Determine file type and upload
+    match = UPLOADABLE_RE.search(file_path)
+    if not match:
+        print(" Unsupported file type. Only .pdf and .txt files are supported.")
+    elif match.group(1).lower() == 'pdf':
+        upload_pdf(file_path, args.session_id, args.strategy)
+    else:
+        upload_text(file_path, args.description, args.session_id, args.strategy)
+
+
+def _cmd_dir(args):
+    """Handle the dir command"""
+    upload_directory(_resolve_path(args.path), args.pattern, args.session_id, args.strategy, args.workers, args.force)
+
+
+def _cmd_category(args):
+    """Handle the category command"""
+    upload_specific_category(args.path, args.session_id, args.strategy, args.workers, args.force)
+
+
+def _cmd_all(args):
+    """Handle the all command"""
+    upload_all_content(args.session_id, args.strategy, args.workers, args.force)
 
 
 def main():
@@ -189,70 +382,47 @@ Available categories: admin, hw, projects, labs
         """
     )
     
-    parser.add_argument('command', choices=['file', 'dir', 'category', 'all'],
-                       help='Upload command: file (single file), dir (directory), category (predefined), all (everything)')
-    parser.add_argument('path', nargs='?', default=None,
-                       help='File path, directory path, or category name')
-    parser.add_argument('--session-id', default='GenericSession',
+    # Options shared by every command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--session-id', default='GenericSession',
                        help='Session ID for upload (default: GenericSession)')
-    parser.add_argument('--strategy', default='smart', choices=['smart', 'fixed'],
+    common.add_argument('--strategy', default='smart', choices=['smart', 'fixed'],
                        help='Upload strategy (default: smart)')
-    parser.add_argument('--pattern', default=None,
-                       help='Filter files by pattern (e.g., "metrosim")')
-    parser.add_argument('--description', default=None,
-                       help='Description for text file uploads')
     
-    args = parser.parse_args()
+    # Options shared by the commands that upload many files
+    batch = argparse.ArgumentParser(add_help=False)
+    batch.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                      help=f'Number of files to upload concurrently (default: {DEFAULT_WORKERS})')
+    batch.add_argument('--force', action='store_true',
+                      help='Re-upload files even if they were already uploaded unchanged')
     
-    # Resolve relative paths to absolute paths
-    base_path = os.path.dirname(os.path.abspath(__file__))
+    commands = parser.add_subparsers(dest='command', required=True,
+                                     help='Upload command')
+    
+    file_parser = commands.add_parser('file', parents=[common], help='Upload a single file')
+    file_parser.add_argument('path', help='PDF or text file to upload')
+    file_parser.add_argument('--description', default=None,
+                            help='Description for text file uploads')
+    file_parser.set_defaults(func=_cmd_file)
+    
+    dir_parser = commands.add_parser('dir', parents=[common, batch], help='Upload all files from a directory')
+    dir_parser.add_argument('path', help='Directory to upload')
+    dir_parser.add_argument('--pattern', default=None,
+                           help='Filter files by pattern (e.g., "metrosim")')
+    dir_parser.set_defaults(func=_cmd_dir)
+    
+    category_parser = commands.add_parser('category', parents=[common, batch], help='Upload a predefined category')
+    category_parser.add_argument('path', metavar='category', choices=list(CONTENT_DIRECTORIES),
+                                help='Category to upload')
+    category_parser.set_defaults(func=_cmd_category)
+    
+    all_parser = commands.add_parser('all', parents=[common, batch], help='Upload everything')
+    all_parser.set_defaults(func=_cmd_all)
+    
+    args = parser.parse_args()
     
     try:
-        if args.command == 'file':
-            if not args.path:
-                print(" Error: file path required")
-                parser.print_help()
-                return
-            
-            # Resolve file path
-            if not os.path.isabs(args.path):
-                file_path = os.path.join(base_path, args.path)
-            else:
-                file_path = args.path
-            
-            # Determine file type and upload
-            if file_path.lower().endswith('.pdf'):
-                upload_pdf(file_path, args.session_id, args.strategy)
-            elif file_path.lower().endswith('.txt'):
-                upload_text(file_path, args.description, args.session_id, args.strategy)
-            else:
-                print(" Unsupported file type. Only .pdf and .txt files are supported.")
-        
-        elif args.command == 'dir':
-            if not args.path:
-                print(" Error: directory path required")
-                parser.print_help()
-                return
-            
-            # Resolve directory path
-            if not os.path.isabs(args.path):
-                dir_path = os.path.join(base_path, args.path)
-            else:
-                dir_path = args.path
-            
-            upload_directory(dir_path, args.pattern, args.session_id, args.strategy)
-        
-        elif args.command == 'category':
-            if not args.path:
-                print(" Error: category name required")
-                print(f"Available categories: {', '.join(CONTENT_DIRECTORIES.keys())}")
-                return
-            
-            upload_specific_category(args.path, args.session_id, args.strategy)
-        
-        elif args.command == 'all':
-            upload_all_content(args.session_id, args.strategy)
-        
+        args.func(args)
     except Exception as e:
         print(f" Error: {e}")
         import traceback